@@ -30,8 +30,12 @@ class StdMapData():
             yield [ std_hitobject.time, (std_hitobject.pos.x, std_hitobject.pos.y) ]
         
         elif std_hitobject.is_hitobject_type(Hitobject.SLIDER):
-            for aimpoint_time in std_hitobject.get_aimpoint_times():
-                yield [ aimpoint_time, np.asarray([ std_hitobject.time_to_pos(aimpoint_time).x, std_hitobject.time_to_pos(aimpoint_time).y ]) ]
+            aimpoint_times = std_hitobject.get_aimpoint_times()
+            if len(aimpoint_times) == 0: return
+
+            # Positions of all of the slider's aimpoints are looked up at once
+            for aimpoint_time, aimpoint_pos in zip(aimpoint_times, std_hitobject.times_to_pos(aimpoint_times)):
+                yield [ aimpoint_time, aimpoint_pos ]
 
     
     @staticmethod
@@ -41,9 +45,40 @@ class StdMapData():
             if len(aimpoints) > 0: yield aimpoints
 
 
+    """
+    Args:
+        std_hitobjects: (list) hitobjects of the beatmap
+        hitobject_table: (Beatmap.HitobjectTable) the beatmap's hitobjects, if it was loaded with a table instead of std_hitobjects
+
+    Returns:
+        Aimpoint data of the hitobjects, see above
+    """
+    @staticmethod
+    def get_aimpoint_data(std_hitobjects, hitobject_table=None):
+        if hitobject_table is None:
+            return np.asarray(list(StdMapData.std_hitobjects_to_aimpoints(std_hitobjects)))
+
+        return np.asarray(StdMapData.hitobject_table_to_aimpoints(hitobject_table))
+
+
+    # Same as std_hitobjects_to_aimpoints for a beatmap loaded with a table. The circles' aimpoints are
+    # selected out of the columns all at once; only the sliders' are made from their objects.
     @staticmethod
-    def get_aimpoint_data(std_hitobjects):
-        return np.asarray(list(StdMapData.std_hitobjects_to_aimpoints(std_hitobjects)))
+    def hitobject_table_to_aimpoints(hitobject_table):
+        aimpoints = [ None ]*len(hitobject_table)
+
+        circle_rows = np.flatnonzero(hitobject_table.is_hitobject_type(Hitobject.CIRCLE))
+        circle_pos  = zip(hitobject_table.x[circle_rows].tolist(), hitobject_table.y[circle_rows].tolist())
+
+        for i, time, pos in zip(circle_rows.tolist(), hitobject_table.time[circle_rows].tolist(), circle_pos):
+            aimpoints[i] = [ [ time, pos ] ]
+
+        for i, slider in zip(np.flatnonzero(hitobject_table.is_slider()).tolist(), hitobject_table.sliders):
+            slider_aimpoints = list(StdMapData.std_hitobject_to_aimpoints(slider))
+            if len(slider_aimpoints) > 0: aimpoints[i] = slider_aimpoints
+
+        # Spinners have no aimpoints
+        return [ hitobject_aimpoints for hitobject_aimpoints in aimpoints if hitobject_aimpoints is not None ]
 
 
     @staticmethod
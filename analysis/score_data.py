@@ -4,6 +4,7 @@ import numpy as np
 from misc.math_utils import get_distance
 
 from std.std import Std
+from analysis.map_data import StdMapData
 from analysis.replay_data import StdReplayData
 
 
@@ -76,10 +77,21 @@ class StdScoreData():
         curr_key_event_idx = 0
         score_data = []
 
+        # First aimpoint of every hitobject, as whole-map arrays
+        aimpoint_times = StdMapData.start_times(map_data)
+        aimpoint_cors  = StdMapData.start_positions(map_data)
+
+        # For every hitobject, the first replay event that leaves its positive miss window.
+        # Press times are sorted, so all of them are found with one search.
+        if len(event_data) == 0: key_event_idxs = np.zeros(len(map_data), dtype=int)
+        else:
+            lookforward_times = aimpoint_times + StdScoreData.pos_hit_range + StdScoreData.pos_hit_miss_range
+            key_event_idxs    = np.searchsorted(event_data[:,1], lookforward_times, side='left')
+
         # Go through each hitobject
         for hitobject_idx in range(len(map_data)):
             # Get first aimpoint in the hitobject
-            aimpoint_time, aimpoint_cor = map_data[hitobject_idx][0]
+            aimpoint_time, aimpoint_cor = aimpoint_times[hitobject_idx], aimpoint_cors[hitobject_idx]
 
             # To keep track of whether there was a tap that corresponded to this hitobject
             is_hitobject_consumed = False
@@ -87,7 +99,7 @@ class StdScoreData():
             # Modify hit windows
             if StdScoreData.notelock:
                 # TODO:
-                prev_aimpoint_time, prev_aimpoint_cor = map_data[hitobject_idx - 1][0]
+                prev_aimpoint_time, prev_aimpoint_cor = aimpoint_times[hitobject_idx - 1], aimpoint_cors[hitobject_idx - 1]
                 # neg 
                 # neg_miss_range = 
                 pass
@@ -96,16 +108,9 @@ class StdScoreData():
                 # TODO
                 pass
 
-            if len(event_data) == 0: key_event_idx = 0
-            else:
-                # Get first replay event that leaeves the hitobject's positive miss window
-                lookforward_time = aimpoint_time + StdScoreData.pos_hit_range + StdScoreData.pos_hit_miss_range
-                key_event_idx = np.where(event_data[:,1] >= lookforward_time)[0]
-
-                # If there are no replay events after the hitobject, get up to the last one;
-                # if curr_key_event_idx is equal to it, then the for loop isn't going to run anyway
-                if len(key_event_idx) == 0: key_event_idx = len(event_data)
-                else:                       key_event_idx = key_event_idx[0]
+            # If there are no replay events after the hitobject, this is up to the last one;
+            # if curr_key_event_idx is equal to it, then the for loop isn't going to run anyway
+            key_event_idx = key_event_idxs[hitobject_idx]
             
             # Go through unprocessed replay events
             for idx in range(curr_key_event_idx, key_event_idx):
@@ -0,0 +1,181 @@
+import argparse
+import os
+import time
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from file.beatmap_io import BeatmapIO
+from file.replay_io import ReplayIO
+
+from analysis.map_data import StdMapData
+from analysis.replay_data import StdReplayData
+from analysis.score_data import StdScoreData
+from analysis.score_metrics import StdScoreMetrics
+
+
+'''
+Description: Runs the hit offset analysis over locally stored beatmaps and replays
+
+Replays are matched to beatmaps by the md5 of the beatmap file. Each beatmap and
+its replays are processed in a separate process, so throughput scales with the
+number of cores.
+
+The output is a .npz file with one column per array and one row per hitobject:
+    beatmap_md5   - md5 of the beatmap the hitobject is in
+    beatmap_file  - filename of the beatmap the hitobject is in
+    hitobject_idx - index of the hitobject in the beatmap's aimpoint data
+    time          - time of the hitobject
+    hit_offset    - offset half of the players hit the hitobject within
+    num_replays   - number of replays the hit offset was solved from
+
+Usage:
+    python batch.py --beatmaps path/to/osu --replays path/to/osr --output hit_offsets.npz
+'''
+class HitOffsetBatch():
+
+    """
+    Args:
+        beatmap_dir: (string) directory to search for .osu files in, recursively
+        replay_dir: (string) directory to search for .osr files in, recursively
+        output: (string) filepath of the .npz file to write
+        num_processes: (int) number of worker processes; None for one per core
+    """
+    @staticmethod
+    def run(beatmap_dir, replay_dir, output, num_processes=None):
+        beatmap_files = HitOffsetBatch.find_beatmaps(beatmap_dir)
+        replay_files  = HitOffsetBatch.find_replays(replay_dir, beatmap_files.keys())
+        print('Found ' + str(len(beatmap_files)) + ' beatmaps and ' + str(sum(len(files) for files in replay_files.values())) + ' matching replays')
+
+        columns = { 'beatmap_md5' : [], 'beatmap_file' : [], 'hitobject_idx' : [], 'time' : [], 'hit_offset' : [], 'num_replays' : [] }
+        start   = time.time()
+
+        with ProcessPoolExecutor(max_workers=num_processes) as pool:
+            futures = { pool.submit(HitOffsetBatch.process_beatmap, beatmap_files[md5], replay_files[md5]) : md5 for md5 in replay_files }
+
+            for i, future in enumerate(as_completed(futures)):
+                md5 = futures[future]
+
+                try: times, hit_offsets, num_replays = future.result()
+                except Exception as e:
+                    print('Failed ' + beatmap_files[md5] + ': ' + str(e))
+                    continue
+
+                if times is None: continue
+
+                columns['beatmap_md5']   += [ md5 ]*len(times)
+                columns['beatmap_file']  += [ os.path.basename(beatmap_files[md5]) ]*len(times)
+                columns['hitobject_idx'] += list(range(len(times)))
+                columns['time']          += list(times)
+                columns['hit_offset']    += list(hit_offsets)
+                columns['num_replays']   += [ num_replays ]*len(times)
+
+                print('[' + str(i + 1) + '/' + str(len(futures)) + '] ' + os.path.basename(beatmap_files[md5]) + ' (' + str(num_replays) + ' replays)')
+
+        np.savez_compressed(output,
+            beatmap_md5   = np.asarray(columns['beatmap_md5'], dtype=str),
+            beatmap_file  = np.asarray(columns['beatmap_file'], dtype=str),
+            hitobject_idx = np.asarray(columns['hitobject_idx'], dtype=np.int32),
+            time          = np.asarray(columns['time'], dtype=float),
+            hit_offset    = np.asarray(columns['hit_offset'], dtype=float),
+            num_replays   = np.asarray(columns['num_replays'], dtype=np.int32),
+        )
+        print('Wrote ' + str(len(columns['time'])) + ' rows to ' + output + ' in ' + str(round(time.time() - start, 2)) + ' s')
+
+
+    """
+    Returns:
+        { md5 : filepath } for every .osu file in the directory
+    """
+    @staticmethod
+    def find_beatmaps(beatmap_dir):
+        beatmap_files = {}
+
+        for filepath in HitOffsetBatch.__find_files(beatmap_dir, '.osu'):
+            with open(filepath, 'rb') as f:
+                beatmap_files[BeatmapIO.get_md5(f)] = filepath
+
+        return beatmap_files
+
+
+    """
+    Args:
+        replay_dir: (string) directory to search for .osr files in
+        md5s: (iterable) md5s of beatmaps to keep replays of
+
+    Returns:
+        { md5 : [ filepath, ... ] } of the replays played on each beatmap
+    """
+    @staticmethod
+    def find_replays(replay_dir, md5s):
+        md5s = set(md5s)
+        replay_files = {}
+
+        for filepath in HitOffsetBatch.__find_files(replay_dir, '.osr'):
+            # The beatmap md5 is near the start of the file; no need to read the rest
+            with open(filepath, 'rb') as f:
+                try: md5 = ReplayIO.load_beatmap_hash(f.read(1024))
+                except Exception:
+                    print('Unable to read ' + filepath)
+                    continue
+
+            if not md5 in md5s: continue
+
+            if not md5 in replay_files: replay_files[md5] = []
+            replay_files[md5].append(filepath)
+
+        return replay_files
+
+
+    """
+    Runs in a worker process
+
+    Args:
+        beatmap_file: (string) filepath of the .osu file
+        replay_files: (list) filepaths of the .osr files played on the beatmap
+
+    Returns:
+        (times, hit_offsets, num_replays); times and hit_offsets are None if no replay could be scored
+    """
+    @staticmethod
+    def process_beatmap(beatmap_file, replay_files):
+        beatmap  = BeatmapIO.open_beatmap(beatmap_file, hitobject_table=True)
+        map_data = StdMapData.get_aimpoint_data(beatmap.hitobjects, beatmap.hitobject_table)
+
+        score_data_array = []
+        for replay_file in replay_files:
+            try: replay = ReplayIO.open_replay(replay_file)
+            except Exception as e:
+                print('Unable to load ' + replay_file + ': ' + str(e))
+                continue
+
+            replay_data = StdReplayData.get_event_data(replay.play_data)
+            score_data_array.append(StdScoreData.get_score_data(replay_data, map_data))
+
+        if not score_data_array:
+            return None, None, 0
+
+        per_hitobject_data = StdScoreMetrics.get_per_hitobject_score_data(score_data_array)
+        times, hit_offsets = StdScoreMetrics.trans_solve_for_hit_offset(per_hitobject_data)
+
+        return times, hit_offsets, len(score_data_array)
+
+
+    @staticmethod
+    def __find_files(path, extension):
+        for root, dirs, files in os.walk(path):
+            for filename in files:
+                if filename.lower().endswith(extension):
+                    yield os.path.join(root, filename)
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calculate per-hitobject hit offsets for local beatmaps and replays')
+    parser.add_argument('--beatmaps', required=True, help='directory containing .osu files')
+    parser.add_argument('--replays', required=True, help='directory containing .osr files')
+    parser.add_argument('--output', default='hit_offsets.npz', help='.npz file to write results to')
+    parser.add_argument('--processes', type=int, default=None, help='number of worker processes; defaults to one per core')
+    args = parser.parse_args()
+
+    HitOffsetBatch.run(args.beatmaps, args.replays, args.output, args.processes)
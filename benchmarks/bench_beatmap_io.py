@@ -0,0 +1,193 @@
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from file.beatmap import Beatmap
+from file.beatmap_io import BeatmapIO
+from std.std_hitobject import Hitobject
+from std.hitobject.std_singlenote_io import StdSingleNoteIO
+from std.hitobject.std_holdnote_io import StdHoldNoteIO
+from std.hitobject.std_spinner_io import StdSpinnerIO
+
+from fixtures import Fixtures
+
+
+'''
+Measures how fast BeatmapIO loads large beatmaps, like marathons with thousands of
+hitobjects and maps with big storyboards in their [Events] section.
+
+Every beatmap is loaded twice: with the [HitObjects] section parsed one line at a
+time the way BeatmapIO used to, and with BeatmapIO's bulk parser. Both are timed
+on the same machine in the same run, so the speedup of the bulk parser is shown
+without needing a baseline. The load time with the hitobject table is shown as well.
+
+Results can be saved as a baseline. Later runs are compared against the baseline and
+beatmaps that got slower to load than the threshold are flagged as regressions, in
+which case the exit code is 1, the same way as in bench_pipeline.py.
+
+Usage:
+    python benchmarks/bench_beatmap_io.py --save-baseline
+    python benchmarks/bench_beatmap_io.py
+'''
+
+BASELINE_FILEPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'beatmap_io_baseline.json')
+
+NUM_RUNS = 5
+
+
+"""
+Returns:
+    { name : contents of the .osu file } of the beatmaps to benchmark on
+"""
+def make_corpus():
+    return {
+        'marathon 5k'                 : Fixtures.make_beatmap(5000),
+        'marathon 20k'                : Fixtures.make_beatmap(20000),
+        'stream marathon 20k'         : make_circles_only(20000),
+        'streams 5k + storyboard 50k' : add_storyboard(make_circles_only(5000), 50000),
+    }
+
+
+# Keeps only the circles and spinners, so time goes to parsing rather than slider curves
+def make_circles_only(num_hitobjects):
+    lines = Fixtures.make_beatmap(num_hitobjects).split('\n')
+    start = lines.index('[HitObjects]') + 1
+
+    return '\n'.join(lines[:start] + [ line for line in lines[start:] if line and int(line.split(',')[3]) & 2 == 0 ]) + '\n'
+
+
+# Adds storyboard commands to the [Events] section
+def add_storyboard(beatmap_data, num_lines):
+    rand  = random.Random(0)
+    lines = [ 'Sprite,Foreground,Centre,"sb/dot.png",320,240' ]
+
+    for i in range(num_lines):
+        start = rand.randint(0, 600000)
+        lines.append(' M,0,' + str(start) + ',' + str(start + 500) + ',' + str(rand.randint(0, 640)) + ',' + str(rand.randint(0, 480)) + ',320,240')
+
+    return beatmap_data.replace('//Storyboard Layer 0 (Background)\n', '//Storyboard Layer 0 (Background)\n' + '\n'.join(lines) + '\n')
+
+
+# How BeatmapIO parsed the [HitObjects] section before it was parsed in bulk: each line is split and loaded on its own
+def parse_hitobjects_per_line(lines, beatmap):
+    for line in lines:
+        data = line.split(',')
+        if len(data) < 2: continue
+
+        if beatmap.gamemode != Beatmap.GAMEMODE_OSU:
+            raise Exception('Unsupported Gamemode: ' + str(beatmap.gamemode))
+
+        hitobject_type = int(data[3])
+
+        if   hitobject_type & Hitobject.CIRCLE:  beatmap.hitobjects.append(StdSingleNoteIO.load_singlenote(data, beatmap.difficulty))
+        elif hitobject_type & Hitobject.SLIDER:  beatmap.hitobjects.append(StdHoldNoteIO.load_holdnote(data, beatmap.difficulty))
+        elif hitobject_type & Hitobject.SPINNER: beatmap.hitobjects.append(StdSpinnerIO.load_spinner(data, beatmap.difficulty))
+
+
+"""
+Loads the beatmap with the per-line [HitObjects] parser in place of BeatmapIO's own
+
+Returns:
+    The loaded beatmap
+"""
+def load_beatmap_per_line(beatmap_data):
+    if BeatmapIO.SECTION_MAP == None:
+        BeatmapIO.init()
+
+    parse_hitobjects = BeatmapIO.SECTION_MAP[BeatmapIO.Section.SECTION_HITOBJECTS]
+    BeatmapIO.SECTION_MAP[BeatmapIO.Section.SECTION_HITOBJECTS] = parse_hitobjects_per_line
+
+    try: return BeatmapIO.load_beatmap(io.StringIO(beatmap_data))
+    finally:
+        BeatmapIO.SECTION_MAP[BeatmapIO.Section.SECTION_HITOBJECTS] = parse_hitobjects
+
+
+def load_beatmap(beatmap_data):
+    return BeatmapIO.load_beatmap(io.StringIO(beatmap_data))
+
+
+def load_beatmap_table(beatmap_data):
+    return BeatmapIO.load_beatmap(io.StringIO(beatmap_data), hitobject_table=True)
+
+
+def measure(load, beatmap_data):
+    times = []
+    for _ in range(NUM_RUNS):
+        start = time.perf_counter()
+        load(beatmap_data)
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+# Raises if the bulk parser loaded different hitobjects than the per-line one
+def check_same_hitobjects(beatmap_data):
+    per_line_hitobjects = load_beatmap_per_line(beatmap_data).hitobjects
+    bulk_hitobjects     = load_beatmap(beatmap_data).hitobjects
+
+    if len(per_line_hitobjects) != len(bulk_hitobjects):
+        raise Exception('Bulk parser loaded ' + str(len(bulk_hitobjects)) + ' hitobjects instead of ' + str(len(per_line_hitobjects)))
+
+    for per_line_hitobject, bulk_hitobject in zip(per_line_hitobjects, bulk_hitobjects):
+        if type(per_line_hitobject) != type(bulk_hitobject) or per_line_hitobject.time != bulk_hitobject.time or per_line_hitobject.pos != bulk_hitobject.pos or \
+           per_line_hitobject.get_end_time() != bulk_hitobject.get_end_time():
+            raise Exception('Bulk parser loaded a different hitobject at ' + str(per_line_hitobject.time) + ' ms')
+
+
+def load_baseline():
+    try:
+        with open(BASELINE_FILEPATH, 'rt') as f:
+            return json.load(f)
+    except OSError:
+        return None
+
+
+def save_baseline(results):
+    with open(BASELINE_FILEPATH, 'wt') as f:
+        json.dump(results, f, indent=4)
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark BeatmapIO on large beatmaps')
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown relative to the baseline that counts as a regression')
+    args = parser.parse_args()
+
+    baseline    = load_baseline() or {}
+    results     = {}
+    regressions = []
+
+    print('%-32s %11s %13s %13s %9s %13s' % ('beatmap', 'size', 'per line', 'bulk', 'speedup', 'with table'))
+
+    for name, beatmap_data in make_corpus().items():
+        check_same_hitobjects(beatmap_data)
+
+        per_line_time = measure(load_beatmap_per_line, beatmap_data)
+        table_time    = measure(load_beatmap_table, beatmap_data)
+        results[name] = measure(load_beatmap, beatmap_data)
+
+        line = '%-32s %8.1f KB %10.2f ms %10.2f ms %8.1fx %10.2f ms' % (name, len(beatmap_data)/1024, per_line_time*1000, results[name]*1000, per_line_time/results[name], table_time*1000)
+        if name in baseline:
+            ratio = results[name] / baseline[name]
+            line += '   x%.2f vs baseline' % ratio
+
+            if ratio > args.threshold:
+                line += '   REGRESSION'
+                regressions.append(name)
+
+        print(line)
+
+    if args.save_baseline:
+        save_baseline(results)
+        print('Saved baseline to ' + BASELINE_FILEPATH)
+
+    if regressions and not args.save_baseline:
+        print(str(len(regressions)) + ' regression(s) found')
+        sys.exit(1)
@@ -0,0 +1,105 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from misc.bezier import Bezier
+from misc.pos import Pos
+
+
+'''
+Compares evaluating Bezier curves one point at a time with Bezier.point_at against
+evaluating all points at once with Bezier.points_at, on random curves of various
+degrees and lengths. Reports the time of both and the largest difference between
+their points.
+
+Usage:
+    python benchmarks/bench_bezier.py
+    python benchmarks/bench_bezier.py --curves 500
+'''
+
+NUM_RUNS  = 3
+TOLERANCE = 1e-6  # osu!pixels
+
+DEGREES = [ 2, 4, 8, 16, 32 ]
+LENGTHS = [ 100, 400, 1600 ]  # approximate curve length in osu!pixels
+
+
+"""
+Returns:
+    List of (control points, number of samples), like the Beziers of sliders with the degree and length
+"""
+def make_curves(degree, length, num_curves, seed=0):
+    rand   = random.Random(seed)
+    curves = []
+
+    for _ in range(num_curves):
+        # A random walk with steps adding up to about the length
+        step   = length/degree
+        points = [ Pos(rand.uniform(0, 512), rand.uniform(0, 384)) ]
+        for _ in range(degree):
+            points.append(Pos(points[-1].x + rand.uniform(-step, step), points[-1].y + rand.uniform(-step, step)))
+
+        approx_length = sum(points[i].distance_to(points[i + 1]) for i in range(len(points) - 1))
+        curves.append((points, int(approx_length / 4.0) + 2))
+
+    return curves
+
+
+def evaluate_point_at(curves):
+    return [ [ Bezier.point_at(points, float(i) / float(num_samples - 1)) for i in range(num_samples) ] for points, num_samples in curves ]
+
+
+def evaluate_points_at(curves):
+    return [ Bezier.points_at(points, num_samples) for points, num_samples in curves ]
+
+
+def measure(function, curves):
+    times = []
+    for _ in range(NUM_RUNS):
+        start = time.perf_counter()
+        result = function(curves)
+        times.append(time.perf_counter() - start)
+
+    return min(times), result
+
+
+def get_max_difference(point_at_result, points_at_result):
+    max_difference = 0
+    for points, array in zip(point_at_result, points_at_result):
+        for point, (x, y) in zip(points, array.tolist()):
+            max_difference = max(max_difference, abs(point.x - x), abs(point.y - y))
+
+    return max_difference
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark per-point against batched Bezier evaluation')
+    parser.add_argument('--curves', type=int, default=100, help='number of curves per degree and length')
+    args = parser.parse_args()
+
+    print('%-8s %-8s %14s %14s %9s %12s' % ('degree', 'length', 'point_at', 'points_at', 'speedup', 'max diff'))
+
+    failed = False
+    for degree in DEGREES:
+        for length in LENGTHS:
+            curves = make_curves(degree, length, args.curves)
+
+            # The basis matrices are built by the first run and reused by the others, as they
+            # are once a few sliders were generated
+            Bezier.basis_cache.clear()
+            points_at_time, points_at_result = measure(evaluate_points_at, curves)
+            point_at_time, point_at_result   = measure(evaluate_point_at, curves)
+
+            max_difference = get_max_difference(point_at_result, points_at_result)
+            failed = failed or max_difference > TOLERANCE
+
+            print('%-8d %-8d %11.2f ms %11.2f ms %8.1fx %12.2e' % (degree, length, point_at_time*1000, points_at_time*1000, point_at_time/points_at_time, max_difference))
+
+    if failed:
+        print('Points differ by more than ' + str(TOLERANCE))
+        sys.exit(1)
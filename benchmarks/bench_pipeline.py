@@ -0,0 +1,183 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from file.beatmap_io import BeatmapIO
+from file.replay_io import ReplayIO
+
+from analysis.map_data import StdMapData
+from analysis.replay_data import StdReplayData
+from analysis.score_data import StdScoreData
+from analysis.score_metrics import StdScoreMetrics
+
+from fixtures import Fixtures
+
+
+'''
+Measures time and peak memory of every stage of the hit offset pipeline on synthetic
+beatmaps and replays of various sizes. Runs offline.
+
+Results can be saved as a baseline. Later runs are compared against the baseline and
+stages that got slower than the threshold are flagged as regressions, in which case
+the exit code is 1.
+
+Usage:
+    python benchmarks/bench_pipeline.py --save-baseline
+    python benchmarks/bench_pipeline.py
+'''
+
+BASELINE_FILEPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+NUM_HITOBJECTS = [ 100, 500, 2000 ]
+NUM_REPLAYS    = 5
+NUM_RUNS       = 3
+
+
+class PipelineBenchmark():
+
+    def __init__(self, num_hitobjects):
+        self.num_hitobjects = num_hitobjects
+
+        self.beatmap_data = Fixtures.make_beatmap(num_hitobjects)
+        self.beatmap_md5  = hashlib.md5(self.beatmap_data.encode('utf-8')).hexdigest()
+
+        beatmap = BeatmapIO.load_beatmap(io.StringIO(self.beatmap_data))
+        self.replay_files = [ Fixtures.make_replay(beatmap, self.beatmap_md5, seed) for seed in range(NUM_REPLAYS) ]
+
+        # Output of each stage, used as the input of the next one
+        self.beatmap            = None
+        self.map_data           = None
+        self.replays            = None
+        self.replay_data        = None
+        self.per_hitobject_data = None
+
+
+    """
+    Returns:
+        [ (stage name, function running the stage) ] in pipeline order
+    """
+    def get_stages(self):
+        return [
+            ('BeatmapIO.load_beatmap',                     self.load_beatmap),
+            ('StdMapData.get_aimpoint_data',               self.get_aimpoint_data),
+            ('ReplayIO.load_replay',                       self.load_replays),
+            ('StdReplayData.get_event_data',               self.get_event_data),
+            ('StdScoreData.get_score_data',                self.get_score_data),
+            ('StdScoreMetrics.trans_solve_for_hit_offset', self.solve_for_hit_offset),
+        ]
+
+
+    def load_beatmap(self):
+        self.beatmap = BeatmapIO.load_beatmap(io.StringIO(self.beatmap_data), hitobject_table=True)
+
+
+    def get_aimpoint_data(self):
+        # Slider curves are generated on first use and kept; drop them so every run generates them
+        for slider in self.beatmap.hitobject_table.sliders:
+            slider.gen_points = None
+
+        self.map_data = StdMapData.get_aimpoint_data(self.beatmap.hitobjects, self.beatmap.hitobject_table)
+
+
+    def load_replays(self):
+        self.replays = [ ReplayIO.load_replay(replay_file) for replay_file in self.replay_files ]
+
+
+    def get_event_data(self):
+        self.replay_data = [ StdReplayData.get_event_data(replay.play_data) for replay in self.replays ]
+
+
+    def get_score_data(self):
+        score_data_array = [ StdScoreData.get_score_data(replay_data, self.map_data) for replay_data in self.replay_data ]
+        self.per_hitobject_data = StdScoreMetrics.get_per_hitobject_score_data(score_data_array)
+
+
+    def solve_for_hit_offset(self):
+        StdScoreMetrics.trans_solve_for_hit_offset(self.per_hitobject_data)
+
+
+    """
+    Returns:
+        { stage name : { 'time' : seconds, 'peak_memory' : bytes } }
+    """
+    def run(self):
+        results = {}
+
+        for name, stage in self.get_stages():
+            times = []
+            for _ in range(NUM_RUNS):
+                start = time.perf_counter()
+                stage()
+                times.append(time.perf_counter() - start)
+
+            # Memory is measured on a separate run since tracing slows everything down
+            tracemalloc.start()
+            stage()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            results[name] = { 'time' : min(times), 'peak_memory' : peak_memory }
+
+        return results
+
+
+def load_baseline():
+    try:
+        with open(BASELINE_FILEPATH, 'rt') as f:
+            return json.load(f)
+    except OSError:
+        return None
+
+
+def save_baseline(results):
+    with open(BASELINE_FILEPATH, 'wt') as f:
+        json.dump(results, f, indent=4)
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark every stage of the hit offset pipeline')
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown relative to the baseline that counts as a regression')
+    args = parser.parse_args()
+
+    baseline    = load_baseline()
+    results     = {}
+    regressions = []
+
+    for num_hitobjects in NUM_HITOBJECTS:
+        size = str(num_hitobjects)
+        print(size + ' hitobjects, ' + str(NUM_REPLAYS) + ' replays')
+
+        results[size] = PipelineBenchmark(num_hitobjects).run()
+
+        for name, result in results[size].items():
+            line = '  %-44s %10.2f ms %10.2f MB' % (name, result['time']*1000, result['peak_memory']/(1024*1024))
+
+            try: baseline_time = baseline[size][name]['time']
+            except (TypeError, KeyError): baseline_time = None
+
+            if baseline_time:
+                ratio = result['time'] / baseline_time
+                line += '   x%.2f vs baseline' % ratio
+
+                if ratio > args.threshold:
+                    line += '   REGRESSION'
+                    regressions.append((size, name))
+
+            print(line)
+
+    if args.save_baseline:
+        save_baseline(results)
+        print('Saved baseline to ' + BASELINE_FILEPATH)
+
+    if regressions and not args.save_baseline:
+        print(str(len(regressions)) + ' regression(s) found')
+        sys.exit(1)
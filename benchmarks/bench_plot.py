@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bot.hit_offset_plot import HitOffsetPlot
+
+
+'''
+Measures render latency and png size of HitOffsetPlot presets for maps of various
+sizes, along with the pyplot dpi=500 savefig to disk it replaced.
+
+Usage:
+    python benchmarks/bench_plot.py
+'''
+
+NUM_HITOBJECTS = [ 500, 1000, 2500, 5000, 10000 ]
+NUM_RUNS       = 3
+
+
+def make_data(num_hitobjects):
+    rng = np.random.default_rng(0)
+    times       = np.cumsum(rng.integers(50, 400, num_hitobjects)).astype(float)
+    hit_offsets = np.abs(rng.normal(20, 10, num_hitobjects))
+    return times, hit_offsets
+
+
+def render_pyplot(times, hit_offsets):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.clf()
+    plt.plot(times, hit_offsets, lw=0.3, antialiased=True)
+    plt.xlabel('time (ms)')
+    plt.ylabel('offset (ms)')
+    plt.title('Per-hitobject offsets half of top 50 players do better/worse')
+    plt.savefig('bench_fig.png', dpi=500)
+
+    with open('bench_fig.png', 'rb') as f:
+        data = f.read()
+    os.remove('bench_fig.png')
+
+    return data
+
+
+def bench(name, raster_size, func, *args):
+    func(*args)  # warm up
+
+    start = time.perf_counter()
+    for _ in range(NUM_RUNS):
+        data = func(*args)
+    elapsed = (time.perf_counter() - start) / NUM_RUNS
+
+    # Memory is measured on a separate run since tracing slows everything down
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # The Agg raster is allocated outside of Python's allocator so tracemalloc does not see it
+    raster_mb = raster_size[0]*raster_size[1]*4/(1024*1024)
+    print('  %-16s %8.1f ms %8.1f KB png %8.1f MB peak python %8.1f MB raster' % (name, elapsed*1000, len(data)/1024, peak/(1024*1024), raster_mb))
+
+
+if __name__ == '__main__':
+    for num_hitobjects in NUM_HITOBJECTS:
+        times, hit_offsets = make_data(num_hitobjects)
+        print(str(num_hitobjects) + ' hitobjects')
+
+        for preset, (width, height, dpi) in HitOffsetPlot.PRESETS.items():
+            bench(preset, (width*dpi, height*dpi), HitOffsetPlot.render, times, hit_offsets, preset)
+        bench('pyplot dpi=500', (6.4*500, 4.8*500), render_pyplot, times, hit_offsets)
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import time
+
+
+'''
+Measures how long a fresh interpreter takes to import the bot and other entry points,
+and which heavy dependencies each of them pulls in at import time.
+
+Usage:
+    python benchmarks/bench_startup.py
+'''
+
+ROOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+NUM_RUNS  = 5
+
+TARGETS = [
+    'run',
+    'batch',
+    'bot.hit_offsets',
+    'bot.hit_offset_plot',
+    'file.beatmap_io',
+    'file.replay_io',
+    'online.osu_online',
+]
+
+HEAVY_MODULES = [ 'discord', 'numpy', 'matplotlib', 'osrparse', 'requests' ]
+
+
+def measure(target):
+    code = (
+        'import sys, time\n'
+        'start = time.perf_counter()\n'
+        'import ' + target + '\n'
+        'elapsed = time.perf_counter() - start\n'
+        'print(elapsed)\n'
+        'print(",".join(m for m in ' + repr(HEAVY_MODULES) + ' if m in sys.modules))\n'
+    )
+
+    times = []
+    for _ in range(NUM_RUNS):
+        start  = time.perf_counter()
+        output = subprocess.run([ sys.executable, '-c', code ], cwd=ROOT_PATH, capture_output=True, text=True, check=True).stdout.split('\n')
+        times.append((float(output[0]), time.perf_counter() - start))
+
+    import_time  = min(t[0] for t in times)
+    process_time = min(t[1] for t in times)
+    return import_time, process_time, output[1]
+
+
+if __name__ == '__main__':
+    print('%-24s %10s %10s   %s' % ('module', 'import', 'process', 'heavy modules loaded'))
+    for target in TARGETS:
+        import_time, process_time, loaded = measure(target)
+        print('%-24s %7.1f ms %7.1f ms   %s' % (target, import_time*1000, process_time*1000, loaded))
@@ -0,0 +1,138 @@
+import lzma
+import random
+import struct
+
+
+'''
+Description: Generates synthetic beatmaps and replays for benchmarks
+
+Beatmaps are osu!std .osu file contents with a mix of circles, bezier, linear and
+circumscribed sliders, and spinners. Replays are .osr file contents of a player
+tapping each hitobject with some random timing error.
+'''
+class Fixtures():
+
+    """
+    Args:
+        num_hitobjects: (int) number of hitobjects in the beatmap
+        seed: (int) random seed
+
+    Returns:
+        Contents of the .osu file as a string
+    """
+    @staticmethod
+    def make_beatmap(num_hitobjects, seed=0):
+        rand  = random.Random(seed)
+        lines = [
+            'osu file format v14', '',
+            '[General]', 'AudioFilename: audio.mp3', 'AudioLeadIn: 0', 'PreviewTime: 0', 'Countdown: 0', 'SampleSet: Soft', 'StackLeniency: 0.7', 'Mode: 0', '',
+            '[Editor]', 'DistanceSpacing: 1', 'BeatDivisor: 4', 'GridSize: 4', 'TimelineZoom: 1', '',
+            '[Metadata]', 'Title:Benchmark', 'TitleUnicode:Benchmark', 'Artist:Fixtures', 'ArtistUnicode:Fixtures', 'Creator:bench',
+            'Version:' + str(num_hitobjects), 'Source:', 'Tags:', 'BeatmapID:' + str(num_hitobjects), 'BeatmapSetID:1', '',
+            '[Difficulty]', 'HPDrainRate:5', 'CircleSize:4', 'OverallDifficulty:8', 'ApproachRate:9', 'SliderMultiplier:1.4', 'SliderTickRate:1', '',
+            '[Events]', '//Background and Video events', '0,0,"bg.jpg",0,0', '//Break Periods', '//Storyboard Layer 0 (Background)', '',
+        ]
+
+        lines += [ '[TimingPoints]' ]
+        for i in range(max(3, num_hitobjects // 100)):
+            # Alternate between uninherited and inherited timing points
+            if i % 2 == 0: lines.append(str(i*30000) + ',500,4,2,0,60,1,0')
+            else:          lines.append(str(i*30000) + ',-' + str(rand.choice([ 50, 100, 150 ])) + ',4,2,0,60,0,0')
+        lines += [ '' ]
+
+        lines += [ '[Colours]', 'Combo1 : 255,128,0', 'Combo2 : 0,128,255', '' ]
+
+        lines += [ '[HitObjects]' ]
+        time = 1000
+        for i in range(num_hitobjects):
+            x, y = rand.randint(64, 448), rand.randint(64, 320)
+            kind = i % 10
+
+            if kind < 5:
+                lines.append(str(x) + ',' + str(y) + ',' + str(time) + ',1,0,0:0:0:0:')
+                time += 250
+            elif kind < 7:
+                points = [ (x + rand.randint(-60, 60), y + rand.randint(-60, 60)) for _ in range(rand.randint(2, 6)) ]
+                lines.append(str(x) + ',' + str(y) + ',' + str(time) + ',2,0,B|' + '|'.join(str(px) + ':' + str(py) for px, py in points) + ',' + str(rand.randint(1, 2)) + ',' + str(rand.randint(80, 240)))
+                time += 1000
+            elif kind < 8:
+                lines.append('100,200,' + str(time) + ',2,0,P|200:100|300:200,1,200')
+                time += 1000
+            elif kind < 9:
+                lines.append(str(x) + ',' + str(y) + ',' + str(time) + ',2,0,L|' + str(x + 70) + ':' + str(y) + ',1,70')
+                time += 500
+            else:
+                lines.append('256,192,' + str(time) + ',12,0,' + str(time + 1000) + ',0:0:0:0:')
+                time += 1500
+
+        return '\n'.join(lines) + '\n'
+
+
+    """
+    Args:
+        beatmap: (Beatmap) loaded beatmap to make a replay of
+        beatmap_md5: (string) md5 of the beatmap file
+        seed: (int) random seed
+        hit_error: (float) standard deviation of the player's timing error in ms
+
+    Returns:
+        Contents of the .osr file as bytes
+    """
+    @staticmethod
+    def make_replay(beatmap, beatmap_md5, seed=0, hit_error=20.0):
+        rand = random.Random(seed)
+
+        # (time, x, y, keys) of every press and release, then filled in with cursor movement every 16 ms
+        taps = []
+        for i, hitobject in enumerate(beatmap.hitobjects):
+            tap_time = int(hitobject.time + rand.gauss(0, hit_error))
+            key = 5 if i % 2 == 0 else 10  # K1 and K2 alternating
+            taps.append((tap_time, hitobject.pos.x, hitobject.pos.y, key))
+            taps.append((tap_time + 40, hitobject.pos.x, hitobject.pos.y, 0))
+
+        frames = []
+        time   = 0
+        x, y   = 256.0, 192.0
+        for tap_time, tap_x, tap_y, keys in sorted(taps):
+            while time + 16 < tap_time:
+                time += 16
+                frames.append((time, x + rand.uniform(-2, 2), y + rand.uniform(-2, 2), 0))
+            time = max(time + 1, tap_time)
+            x, y = tap_x, tap_y
+            frames.append((time, x, y, keys))
+
+        replay_events = []
+        prev_time = 0
+        for time, x, y, keys in frames:
+            replay_events.append(str(time - prev_time) + '|' + str(round(x, 2)) + '|' + str(round(y, 2)) + '|' + str(keys))
+            prev_time = time
+        replay_events.append('-12345|0|0|' + str(seed))  # RNG seed frame
+
+        play_data = lzma.compress((','.join(replay_events) + ',').encode('ascii'))
+
+        data  = struct.pack('<bi', 0, 20200101)
+        data += Fixtures.__pack_string(beatmap_md5)
+        data += Fixtures.__pack_string('player' + str(seed))
+        data += Fixtures.__pack_string('%032x' % seed)
+        data += struct.pack('<hhhhhhih?i', len(beatmap.hitobjects), 0, 0, 0, 0, 0, 1000000, len(beatmap.hitobjects), False, 0)
+        data += Fixtures.__pack_string('')
+        data += struct.pack('<qi', 0, len(play_data)) + play_data
+        data += struct.pack('<q', seed)
+
+        return data
+
+
+    @staticmethod
+    def __pack_string(string):
+        data   = string.encode('utf-8')
+        length = len(data)
+        packed = bytearray([ 0x0b ])
+
+        # ULEB128 string length
+        while True:
+            byte = length & 0x7F
+            length >>= 7
+            packed.append(byte | (0x80 if length else 0))
+            if not length: break
+
+        return bytes(packed) + data
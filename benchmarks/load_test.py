@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from online.osu_online import OsuOnline
+from online.session_manager import SessionMgr
+from cache.beatmap_cache import BeatmapCache
+from cache.job_checkpoint import JobCheckpoint
+from cache.replay_cache import ReplayCache
+from cache.result_cache import ResultCache
+from misc.stats import Stats
+
+from osu_server import OsuServer
+
+
+'''
+Runs the full download and analysis pipeline against the local osu! stand-in and
+measures end-to-end throughput.
+
+All caches and the saved login are kept in a temporary directory, so every run starts
+cold. Requests cycle through the fixture beatmaps, so once every beatmap was requested
+the result and replay caches start getting hits.
+
+Usage:
+    python benchmarks/load_test.py --requests 16 --concurrency 4 --latency 0.1
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --fixtures data/fixtures
+'''
+
+def run(beatmap_ids, num_requests, concurrency):
+    from bot.hit_offsets import HitOffsets
+
+    failures = 0
+    start    = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [ pool.submit(HitOffsets.get_hit_offsets, beatmap_ids[i % len(beatmap_ids)]) for i in range(num_requests) ]
+
+        for future in as_completed(futures):
+            try: future.result()
+            except Exception as e:
+                print('Request failed: ' + str(e))
+                failures += 1
+
+    return time.perf_counter() - start, failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the bot pipeline against a local osu! stand-in')
+    parser.add_argument('--url', default=None, help='url of a running stand-in server; one is started if not given')
+    parser.add_argument('--fixtures', default=None, help='fixture directory; generated in a temporary directory if not given')
+    parser.add_argument('--maps', type=int, default=4, help='number of beatmaps to generate')
+    parser.add_argument('--scores', type=int, default=10, help='number of scores per beatmap to generate')
+    parser.add_argument('--hitobjects', type=int, default=200, help='number of hitobjects per beatmap to generate')
+    parser.add_argument('--requests', type=int, default=8, help='number of beatmap requests to make')
+    parser.add_argument('--concurrency', type=int, default=2, help='number of requests processed at once')
+    parser.add_argument('--rate', type=float, default=20, help='requests per second the rate limiter allows')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds the started server delays every response by')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests the started server answers with 429')
+    parser.add_argument('--max-concurrent', type=int, default=None, help='requests the started server handles at once')
+    args = parser.parse_args()
+
+    tmp_path = tempfile.mkdtemp(prefix='load_test_')
+    fixtures = args.fixtures or os.path.join(tmp_path, 'fixtures')
+
+    if not os.path.exists(fixtures):
+        print('Generating ' + str(args.maps) + ' beatmaps with ' + str(args.scores) + ' scores each')
+        OsuServer.make_fixtures(fixtures, args.maps, args.scores, args.hitobjects)
+
+    server = None
+    url    = args.url
+    if url == None:
+        server = OsuServer(fixtures, latency=args.latency, throttle_rate=args.throttle_rate, max_concurrent=args.max_concurrent)
+        url = server.start()
+
+    OsuOnline.base_url = url
+
+    BeatmapCache.path       = os.path.join(tmp_path, 'beatmaps')
+    ReplayCache.path        = os.path.join(tmp_path, 'replays')
+    JobCheckpoint.path      = os.path.join(tmp_path, 'jobs')
+    ResultCache.path        = os.path.join(tmp_path, 'results')
+    SessionMgr.session_path = os.path.join(tmp_path, 'session.json')
+
+    rate_limiter = OsuOnline.rate_limiter
+    rate_limiter.rate     = args.rate
+    rate_limiter.max_rate = args.rate
+    rate_limiter.min_rate = args.rate/8
+
+    beatmap_ids = OsuServer.get_fixture_beatmap_ids(fixtures)
+    elapsed, failures = run(beatmap_ids, args.requests, args.concurrency)
+
+    print()
+    print('%d requests, %d failed, in %.2f s: %.2f requests/s' % (args.requests, failures, elapsed, args.requests/elapsed))
+
+    if server != None:
+        counters = server.get_counters()
+        print('server: %d http requests (%.1f/s), %d throttled, %d not modified, %.1f MB sent' % (
+            counters['requests'], counters['requests']/elapsed, counters['throttled'], counters['not_modified'], counters['bytes_sent']/1024/1024))
+        server.stop()
+
+    print()
+    print('\n'.join(Stats.get_report()))
@@ -0,0 +1,304 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fixtures import Fixtures
+
+
+'''
+Description: Local stand-in for the parts of osu.ppy.sh the bot uses
+
+Serves beatmaps, leaderboards, logins and replay downloads from fixture files, so the
+online package can be exercised without touching the real website. Point
+OsuOnline.base_url at the server's url to use it.
+
+    GET  /osu/<beatmap id>                      - .osu file; honors If-None-Match
+    GET  /beatmaps/<beatmap id>/scores          - leaderboard json
+    POST /session                               - login; sets osu_session
+    GET  /                                      - sets XSRF-TOKEN and osu_session
+    GET  /scores/<mode>/<score id>/download     - .osr file; requires a login
+
+Fixture files are laid out as
+    beatmaps/<beatmap id>.osu
+    scores/<beatmap id>.json
+    replays/<score id>.osr
+
+Input:
+    fixtures_path - directory with the fixture files; see make_fixtures
+    latency - seconds every response is delayed by
+    jitter - up to this many seconds are randomly added to the latency
+    throttle_rate - fraction of requests answered with 429 Too Many Requests
+    retry_after - seconds the Retry-After header of a 429 asks to wait
+    max_concurrent - requests handled at once; requests past it are answered with 429
+
+Usage:
+    python benchmarks/osu_server.py --fixtures data/fixtures --port 8000 --latency 0.2
+'''
+class OsuServer():
+
+    def __init__(self, fixtures_path, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, throttle_rate=0.0, retry_after=1, max_concurrent=None):
+        self.fixtures_path = fixtures_path
+        self.latency       = latency
+        self.jitter        = jitter
+        self.throttle_rate = throttle_rate
+        self.retry_after   = retry_after
+
+        self.slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent != None else None
+        self.rand  = random.Random(0)
+        self.lock  = threading.Lock()
+
+        self.sessions = set()
+        self.counters = { 'requests' : 0, 'throttled' : 0, 'not_modified' : 0, 'bytes_sent' : 0 }
+
+        self.httpd  = ThreadingHTTPServer((host, port), OsuServer.__make_handler(self))
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+
+    """
+    Serves requests on a background thread
+
+    Returns:
+        Base url of the server
+    """
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.get_url()
+
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+    def get_url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://' + host + ':' + str(port)
+
+
+    """
+    Returns:
+        Copy of the request counters
+    """
+    def get_counters(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+    """
+    Generates fixture files for the server
+
+    Args:
+        path: (string) directory to write the fixture files to
+        num_beatmaps: (int) number of beatmaps, with ids starting at 1000
+        num_scores: (int) number of scores on each beatmap's leaderboard
+        num_hitobjects: (int) number of hitobjects in each beatmap
+
+    Returns:
+        List of the beatmap ids
+    """
+    @staticmethod
+    def make_fixtures(path, num_beatmaps=4, num_scores=10, num_hitobjects=200):
+        from file.beatmap_io import BeatmapIO
+
+        for directory in [ 'beatmaps', 'scores', 'replays' ]:
+            os.makedirs(os.path.join(path, directory), exist_ok=True)
+
+        beatmap_ids = []
+        for i in range(num_beatmaps):
+            beatmap_id   = 1000 + i
+            beatmap_data = Fixtures.make_beatmap(num_hitobjects, seed=beatmap_id)
+            beatmap_md5  = BeatmapIO.get_md5(beatmap_data)
+            beatmap      = BeatmapIO.load_beatmap(io.StringIO(beatmap_data))
+
+            with open(os.path.join(path, 'beatmaps', str(beatmap_id) + '.osu'), 'wb') as f:
+                f.write(beatmap_data.encode('utf-8'))
+
+            scores = []
+            for j in range(num_scores):
+                score_id = beatmap_id*1000 + j
+                scores.append({
+                    'id'      : score_id,
+                    'mode'    : 'osu',
+                    'mods'    : [],
+                    'score'   : 1000000 - j,
+                    'user'    : { 'id' : j, 'username' : 'player' + str(j) },
+                    'beatmap' : { 'id' : beatmap_id, 'mode' : 'osu', 'checksum' : beatmap_md5 },
+                })
+
+                with open(os.path.join(path, 'replays', str(score_id) + '.osr'), 'wb') as f:
+                    f.write(Fixtures.make_replay(beatmap, beatmap_md5, seed=score_id))
+
+            with open(os.path.join(path, 'scores', str(beatmap_id) + '.json'), 'wt', encoding='utf-8') as f:
+                json.dump({ 'scores' : scores }, f)
+
+            beatmap_ids.append(beatmap_id)
+
+        return beatmap_ids
+
+
+    """
+    Returns:
+        Ids of the beatmaps in the fixture directory
+    """
+    @staticmethod
+    def get_fixture_beatmap_ids(path):
+        return sorted([ int(filename[:-len('.osu')]) for filename in os.listdir(os.path.join(path, 'beatmaps')) if filename.endswith('.osu') ])
+
+
+    # Returns (status, headers, body)
+    def handle(self, method, path, headers, body):
+        parts = [ part for part in urlparse(path).path.split('/') if part ]
+
+        if method == 'POST' and parts == [ 'session' ]:
+            token = uuid.uuid4().hex
+            with self.lock: self.sessions.add(token)
+            return 200, [ ('Set-Cookie', 'osu_session=' + token + '; Path=/') ], b'{}'
+
+        if method != 'GET':
+            return 405, [], b''
+
+        if not parts:
+            # The homepage hands out the tokens a logged in browser would have
+            token = headers.get('osu_session') or self.__get_cookie(headers, 'osu_session') or uuid.uuid4().hex
+            with self.lock: self.sessions.add(token)
+            return 200, [ ('Set-Cookie', 'XSRF-TOKEN=' + uuid.uuid4().hex + '; Path=/'), ('Set-Cookie', 'osu_session=' + token + '; Path=/') ], b'<html></html>'
+
+        if len(parts) == 2 and parts[0] == 'osu':
+            data = self.__read_fixture('beatmaps', parts[1] + '.osu')
+            if data == None: return 404, [], b''
+
+            etag = '"' + hashlib.md5(data).hexdigest() + '"'
+            if headers.get('If-None-Match') == etag:
+                with self.lock: self.counters['not_modified'] += 1
+                return 304, [ ('ETag', etag) ], b''
+
+            return 200, [ ('ETag', etag), ('Content-Type', 'text/plain; charset=utf-8') ], data
+
+        if len(parts) == 3 and parts[0] == 'beatmaps' and parts[2] == 'scores':
+            data = self.__read_fixture('scores', parts[1] + '.json')
+            if data == None: return 404, [], b''
+            return 200, [ ('Content-Type', 'application/json') ], data
+
+        if len(parts) == 4 and parts[0] == 'scores' and parts[3] == 'download':
+            token = headers.get('osu_session') or self.__get_cookie(headers, 'osu_session')
+            with self.lock: logged_in = token in self.sessions
+            if not logged_in: return 401, [], b''
+
+            data = self.__read_fixture('replays', parts[2] + '.osr')
+            if data == None: return 404, [], b''
+            return 200, [ ('Content-Type', 'application/octet-stream') ], data
+
+        return 404, [], b''
+
+
+    def __read_fixture(self, directory, filename):
+        # Only plain ids are looked up, so the path can't leave the fixture directory
+        if not filename.split('.')[0].isdigit(): return None
+
+        try:
+            with open(os.path.join(self.fixtures_path, directory, filename), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+
+    def __get_cookie(self, headers, name):
+        for cookie in headers.get('Cookie', '').split(';'):
+            key, _, value = cookie.strip().partition('=')
+            if key == name: return value
+        return None
+
+
+    # Applies the configured concurrency limit, throttling and latency around handle
+    def serve(self, method, path, headers, body):
+        with self.lock: self.counters['requests'] += 1
+
+        if self.slots != None and not self.slots.acquire(blocking=False):
+            with self.lock: self.counters['throttled'] += 1
+            return 429, [ ('Retry-After', str(self.retry_after)) ], b''
+
+        try:
+            with self.lock: throttle = self.rand.random() < self.throttle_rate
+            if throttle:
+                with self.lock: self.counters['throttled'] += 1
+                return 429, [ ('Retry-After', str(self.retry_after)) ], b''
+
+            delay = self.latency + (self.rand.uniform(0, self.jitter) if self.jitter else 0)
+            if delay > 0: time.sleep(delay)
+
+            status, response_headers, data = self.handle(method, path, headers, body)
+            with self.lock: self.counters['bytes_sent'] += len(data)
+
+            return status, response_headers, data
+        finally:
+            if self.slots != None: self.slots.release()
+
+
+    @staticmethod
+    def __make_handler(server):
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real website
+
+            def do_GET(self):
+                self.__respond('GET', b'')
+
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                self.__respond('POST', self.rfile.read(length))
+
+
+            def log_message(self, format, *args):
+                pass
+
+
+            def __respond(self, method, body):
+                status, headers, data = server.serve(method, self.path, self.headers, body)
+
+                self.send_response(status)
+                for key, value in headers:
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a local stand-in for osu.ppy.sh from fixture files')
+    parser.add_argument('--fixtures', default='data/fixtures', help='fixture directory; generated if it does not exist')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds every response is delayed by')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many seconds are randomly added to the latency')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--max-concurrent', type=int, default=None, help='requests handled at once; the rest are answered with 429')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.fixtures):
+        print('Generating fixtures in ' + args.fixtures)
+        OsuServer.make_fixtures(args.fixtures)
+
+    server = OsuServer(args.fixtures, args.host, args.port, args.latency, args.jitter, args.throttle_rate, max_concurrent=args.max_concurrent)
+    print('Serving beatmaps ' + ', '.join(str(beatmap_id) for beatmap_id in OsuServer.get_fixture_beatmap_ids(args.fixtures)) + ' at ' + server.get_url())
+
+    try: server.httpd.serve_forever()
+    except KeyboardInterrupt: pass
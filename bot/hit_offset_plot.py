@@ -0,0 +1,59 @@
+import io
+
+
+'''
+Description: Renders per-hitobject hit offsets to a png image in memory
+
+Every call builds its own figure and draws it with the Agg backend, without going
+through pyplot's global state. Renders can therefore happen from several threads 
+or in a worker process at the same time without interfering with each other.
+
+Input:
+    render - render the times and hit offsets
+
+Output:
+    png image data
+'''
+class HitOffsetPlot():
+
+    # preset name -> (width in, height in, dpi)
+    PRESETS = {
+        'small'   : (6.4, 4.8, 100),
+        'default' : (8.0, 4.5, 150),
+        'large'   : (12.8, 7.2, 200),
+    }
+
+    """
+    Args:
+        times: (numpy.array) hitobject times
+        hit_offsets: (numpy.array) per-hitobject hit offsets
+        preset: (string) key of HitOffsetPlot.PRESETS determining size and resolution of the image
+        title: (string) title of the plot
+
+    Returns:
+        png image data as bytes
+    """
+    @staticmethod
+    def render(times, hit_offsets, preset='default', title='Per-hitobject offsets half of top 50 players do better/worse'):
+        # matplotlib is only loaded by the process that renders
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        width, height, dpi = HitOffsetPlot.PRESETS[preset]
+
+        fig    = Figure(figsize=(width, height), dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+
+        # Fixed margins; tight_layout would cost an extra draw of the whole figure
+        fig.subplots_adjust(left=0.08, right=0.98, bottom=0.11, top=0.92)
+
+        ax = fig.add_subplot(1, 1, 1)
+        ax.plot(times, hit_offsets, lw=0.5, antialiased=True)
+        ax.set_xlabel('time (ms)')
+        ax.set_ylabel('offset (ms)')
+        ax.set_title(title)
+
+        data = io.BytesIO()
+        canvas.print_png(data)
+        
+        return data.getvalue()
@@ -0,0 +1,171 @@
+import io
+import queue
+import threading
+import numpy as np
+
+from file.beatmap_io import BeatmapIO
+from file.replay_io import ReplayIO
+
+from online.osu_online import OsuOnline
+from online.cmd_online import CmdOnline
+
+from analysis.map_data import StdMapData
+from analysis.replay_data import StdReplayData
+from analysis.score_data import StdScoreData, StdScoreDataEnums
+from analysis.score_metrics import StdScoreMetrics
+
+from cache.job_checkpoint import JobCheckpoint
+from cache.result_cache import ResultCache
+from misc.stats import Stats
+
+
+class HitOffsets():
+
+    """
+    Downloads the beatmap and its top scores' replays, then solves for the offsets half
+    of the players hit each hitobject within. 
+    
+    Results are cached. If the leaderboard changed since the result was cached, only the 
+    replays of the new scores are downloaded and scored. The data of every scored replay
+    is checkpointed, so a job interrupted part way resumes from the last scored replay.
+
+    Args:
+        beatmap_id: (int) id of the beatmap
+
+    Returns:
+        (times, hit_offsets) as returned by StdScoreMetrics.trans_solve_for_hit_offset
+    """
+    @staticmethod
+    def get_hit_offsets(beatmap_id):
+        result = ResultCache.get_result(beatmap_id, max_age=ResultCache.max_age)
+        if result != None: 
+            Stats.increment('result_cache_hit')
+            return result
+        
+        Stats.increment('result_cache_miss')
+
+        beatmap_md5, beatmap, map_data = HitOffsets.load_beatmap(beatmap_id)
+
+        scores    = CmdOnline.get_scores(beatmap_id, 0, beatmap.metadata.name)
+        score_ids = [ score.id for score in scores ]
+
+        # Scores carry the md5 of the current version of the beatmap. If the cached beatmap is outdated, get the current one
+        checksums = set([ score.beatmap.get('checksum') for score in scores ]) - { None }
+        if len(checksums) == 1 and not beatmap_md5 in checksums:
+            beatmap_md5, beatmap, map_data = HitOffsets.load_beatmap(beatmap_id, checksums.pop())
+
+        # Reuse data of the scores that are still on the leaderboard; scores no longer on it are dropped
+        score_data = ResultCache.get_score_data(beatmap_id, beatmap_md5)
+        Stats.increment('score_data_reuse_hit', len([ score_id for score_id in score_ids if score_id in score_data ]))
+
+        # Pick up the replays an interrupted run of this job got through
+        checkpoint_data = JobCheckpoint.get_score_data(beatmap_id, beatmap_md5)
+        Stats.increment('checkpoint_resumed', len([ score_id for score_id in score_ids if score_id in checkpoint_data and not score_id in score_data ]))
+        score_data.update(checkpoint_data)
+
+        new_scores = [ score for score in scores if not score.id in score_data ]
+        Stats.increment('score_data_reuse_miss', len(new_scores))
+
+        for score, replay_file in HitOffsets.stream_replays(new_scores):
+            with Stats.timer('replay_decode'):
+                replay_data = StdReplayData.get_event_data(ReplayIO.load_replay(replay_file).play_data)
+
+            with Stats.timer('score'):
+                score_data[score.id] = HitOffsets.reduce_score_data(StdScoreData.get_score_data(replay_data, map_data))
+
+            JobCheckpoint.put_score_data(beatmap_id, beatmap_md5, score.id, score_data[score.id])
+
+        with Stats.timer('solve'):
+            score_data_array   = [ HitOffsets.expand_score_data(score_data[score_id]) for score_id in score_ids ]
+            per_hitobject_data = StdScoreMetrics.get_per_hitobject_score_data(score_data_array)
+            times, hit_offsets = StdScoreMetrics.trans_solve_for_hit_offset(per_hitobject_data)
+
+        ResultCache.put_result(beatmap_id, beatmap_md5, score_ids, times, hit_offsets, [ score_data[score_id] for score_id in score_ids ])
+        JobCheckpoint.remove_score_data(beatmap_id)
+
+        return times, hit_offsets
+
+
+    """
+    Args:
+        beatmap_id: (int) id of the beatmap
+        beatmap_md5: (string) md5 the beatmap is expected to have, if known
+
+    Returns:
+        (beatmap_md5, beatmap, map_data)
+    """
+    @staticmethod
+    def load_beatmap(beatmap_id, beatmap_md5=None):
+        beatmap_data = OsuOnline.fetch_beatmap_file(beatmap_id, beatmap_md5=beatmap_md5)
+
+        with Stats.timer('beatmap_load'):
+            beatmap  = BeatmapIO.load_beatmap(io.StringIO(beatmap_data), hitobject_table=True)
+            map_data = StdMapData.get_aimpoint_data(beatmap.hitobjects, beatmap.hitobject_table)
+
+        return BeatmapIO.get_md5(beatmap_data), beatmap, map_data
+
+
+    """
+    Downloads replays on a separate thread while the caller processes the ones already
+    downloaded. Replay downloads are rate limited, so this way processing a replay 
+    happens during the wait for the next one.
+
+    Args:
+        scores: (list) WebScore of each replay to download
+
+    Returns:
+        Generator of (score, replay_file) in the order of the scores
+    """
+    @staticmethod
+    def stream_replays(scores):
+        replay_queue = queue.Queue()
+        stop_event   = threading.Event()
+
+        downloader = threading.Thread(target=HitOffsets.__download_replays, args=(scores, replay_queue, stop_event), daemon=True)
+        downloader.start()
+
+        try:
+            for _ in range(len(scores)):
+                score, replay_file = replay_queue.get()
+                if isinstance(replay_file, Exception):
+                    raise replay_file
+
+                yield score, replay_file
+        finally:
+            # Stop downloading if the caller stopped processing replays
+            stop_event.set()
+
+
+    @staticmethod
+    def __download_replays(scores, replay_queue, stop_event):
+        for score in scores:
+            if stop_event.is_set(): return
+
+            try: replay_queue.put((score, score.get_replay_data_web()))
+            except Exception as e:
+                replay_queue.put((score, e))
+                return
+
+
+    """
+    Keeps only what is needed to solve for hit offsets out of score data
+
+    Returns:
+        [ [ time, hit_offset ], ... N hitobjects ]
+    """
+    @staticmethod
+    def reduce_score_data(score_data):
+        return np.asarray(score_data[:, [ StdScoreDataEnums.TIME.value, StdScoreDataEnums.HIT_OFFSET.value ]], dtype=float)
+
+
+    """
+    Turns data from HitOffsets.reduce_score_data back into score data. Columns that
+    were not kept are filled with NaN.
+    """
+    @staticmethod
+    def expand_score_data(reduced_score_data):
+        score_data = np.full((len(reduced_score_data), len(StdScoreDataEnums)), np.nan)
+        score_data[:, StdScoreDataEnums.TIME.value]       = reduced_score_data[:, 0]
+        score_data[:, StdScoreDataEnums.HIT_OFFSET.value] = reduced_score_data[:, 1]
+
+        return score_data
@@ -0,0 +1,192 @@
+import asyncio
+import collections
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+'''
+Description: Runs blocking jobs off the asyncio event loop
+
+The jobs are queued on the event loop and handed to a worker executor one at a
+time per worker, so the loop is free to answer heartbeats and other commands
+while a job runs.
+
+Jobs are identified by a key. Submitting a job with the key of a job that is
+already queued or running does not queue a new job; the submitter waits on the
+existing one and gets the same result.
+
+Each user gets their own queue and workers take jobs from the users in turn, so
+one user queueing many jobs does not hold everyone else back.
+
+Input:
+    submit - queue a blocking function to be run by a worker
+
+Output:
+    The result of the function, awaited on the event loop
+'''
+class JobQueue():
+
+    class Job():
+
+        def __init__(self, key, user, name, func, args, future):
+            self.key    = key
+            self.user   = user
+            self.name   = name
+            self.func   = func
+            self.args   = args
+            self.future = future
+
+            self.num_waiters = 1
+            self.submit_time = time.time()
+            self.start_time  = None
+
+
+        """
+        Waits for the job to finish. Cancelling the wait does not cancel the job
+        for the other waiters.
+
+        Returns:
+            The value returned by the job's function
+        """
+        async def wait(self):
+            return await asyncio.shield(self.future)
+
+
+    def __init__(self, num_workers=1):
+        self.num_workers = num_workers
+        self.executor    = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix='job')
+
+        self.jobs         = {}                         # key -> job, for queued and running jobs
+        self.user_queues  = collections.OrderedDict()  # user -> deque of queued jobs, in turn order
+        self.job_ready    = None
+        self.workers      = []
+        self.running_jobs = []
+
+
+    """
+    Starts the worker tasks on the running event loop. Safe to call more than once.
+    """
+    def start(self):
+        if self.workers: return
+
+        self.job_ready = asyncio.Event()
+        self.workers   = [ asyncio.ensure_future(self.__worker()) for _ in range(self.num_workers) ]
+
+
+    """
+    Queues a blocking function to be run by a worker. If a job with the same key is
+    already queued or running, that job is returned instead.
+
+    Args:
+        key: (hashable) identifies the work the job does
+        user: (hashable) who the job is for
+        name: (string) what the job is displayed as in status queries
+        func: (callable) the blocking function to run
+        args: arguments to pass to the function
+
+    Returns:
+        The job. Await job.wait() for the value returned by the function.
+        Exceptions raised by the function are re-raised there.
+    """
+    def submit(self, key, user, name, func, *args):
+        if not self.workers:
+            self.start()
+
+        if key in self.jobs:
+            job = self.jobs[key]
+            job.num_waiters += 1
+            return job
+
+        job = JobQueue.Job(key, user, name, func, args, asyncio.get_running_loop().create_future())
+        self.jobs[key] = job
+
+        if user not in self.user_queues:
+            self.user_queues[user] = collections.deque()
+        self.user_queues[user].append(job)
+
+        self.job_ready.set()
+        return job
+
+
+    """
+    Args:
+        job: (Job) job to get the position of
+
+    Returns:
+        0 if the job is running, otherwise how many jobs will be started before it plus one.
+        None if the job is neither queued nor running.
+    """
+    def get_position(self, job):
+        if job in self.running_jobs: return 0
+
+        try: return self.__get_job_order().index(job) + 1
+        except ValueError: return None
+
+
+    """
+    Returns:
+        The number of jobs waiting for a worker
+    """
+    def get_num_pending(self):
+        return sum(len(user_queue) for user_queue in self.user_queues.values())
+
+
+    """
+    Returns:
+        List of jobs currently being run by workers
+    """
+    def get_running_jobs(self):
+        return list(self.running_jobs)
+
+
+    """
+    Returns:
+        List of queued jobs in the order workers will start them
+    """
+    def get_pending_jobs(self):
+        return self.__get_job_order()
+
+
+    # Order the queued jobs would be started in if nothing else gets queued
+    def __get_job_order(self):
+        user_queues = [ list(user_queue) for user_queue in self.user_queues.values() ]
+        job_order   = []
+
+        for i in range(max([ len(user_queue) for user_queue in user_queues ], default=0)):
+            job_order += [ user_queue[i] for user_queue in user_queues if i < len(user_queue) ]
+
+        return job_order
+
+
+    # Takes the next user's first job and moves that user to the back of the turn order
+    def __next_job(self):
+        user, user_queue = next(iter(self.user_queues.items()))
+        job = user_queue.popleft()
+
+        if user_queue: self.user_queues.move_to_end(user)
+        else:          del self.user_queues[user]
+
+        return job
+
+
+    async def __worker(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            while not self.user_queues:
+                self.job_ready.clear()
+                await self.job_ready.wait()
+
+            job = self.__next_job()
+            job.start_time = time.time()
+            self.running_jobs.append(job)
+
+            try:
+                result = await loop.run_in_executor(self.executor, job.func, *job.args)
+                if not job.future.cancelled(): job.future.set_result(result)
+            except Exception as e:
+                if not job.future.cancelled(): job.future.set_exception(e)
+            finally:
+                self.running_jobs.remove(job)
+                del self.jobs[job.key]
@@ -0,0 +1,143 @@
+import asyncio
+import collections
+import time
+
+from cache.replay_cache import ReplayCache
+from online.osu_online import OsuOnline
+from online.osu_online_async import OsuOnlineAsync
+
+
+'''
+Description: Spends the spare download budget on maps likely to be requested again
+
+Every requested beatmap is remembered along with how often and how recently it was
+requested. While the job queue is empty and the rate limiter has a full bucket, the
+prefetcher refreshes the leaderboards of those beatmaps and downloads the replays that
+are not in the replay cache yet, most requested maps first.
+
+Prefetching is done one small step at a time, a leaderboard refresh or a single replay
+download, and the job queue and rate limiter are checked before each one, so a .get
+request never waits on more than the one step in flight. A full bucket is required so
+the step leaves tokens for the next interactive request.
+
+Input:
+    job_queue - queue of interactive jobs to yield to
+    max_maps - number of beatmaps to remember
+    interval - seconds to wait between checks while there is nothing to do
+    refresh_interval - seconds before a beatmap that was prefetched is prefetched again
+
+Output:
+    record_request - call on every requested beatmap
+'''
+class Prefetcher():
+
+    def __init__(self, job_queue, max_maps=64, interval=5, refresh_interval=30*60):
+        self.job_queue        = job_queue
+        self.max_maps         = max_maps
+        self.interval         = interval
+        self.refresh_interval = refresh_interval
+
+        self.task = None
+
+        self.requests       = collections.OrderedDict()  # beatmap id -> (number of requests, last request time), least recent first
+        self.last_prefetch  = {}                         # beatmap id -> time its prefetch finished
+        self.current_map    = None
+        self.pending_scores = collections.deque()        # scores of the current map whose replays are still to be downloaded
+
+
+    """
+    Starts prefetching on the running event loop. Safe to call more than once.
+    """
+    def start(self):
+        if self.task != None: return
+        self.task = asyncio.ensure_future(self.__run())
+
+
+    """
+    Args:
+        beatmap_id: (int) id of the requested beatmap
+    """
+    def record_request(self, beatmap_id):
+        num_requests, _ = self.requests.pop(beatmap_id, (0, None))
+        self.requests[beatmap_id] = (num_requests + 1, time.time())
+
+        # The request itself fetches everything there is to prefetch
+        self.last_prefetch[beatmap_id] = time.time()
+
+        # Forget the least recently requested maps
+        while len(self.requests) > self.max_maps:
+            old_beatmap_id, _ = self.requests.popitem(last=False)
+            self.last_prefetch.pop(old_beatmap_id, None)
+
+
+    """
+    Returns:
+        True if nothing interactive is queued or running and the rate limiter has tokens to spare
+    """
+    def is_idle(self):
+        if self.job_queue.get_running_jobs() or self.job_queue.get_num_pending() > 0:
+            return False
+
+        return OsuOnline.rate_limiter.is_idle(cost=OsuOnline.rate_limiter.burst)
+
+
+    async def __run(self):
+        while True:
+            if not self.is_idle():
+                await asyncio.sleep(self.interval)
+                continue
+
+            try: has_work = await self.__step()
+            except Exception as e:
+                print('Prefetch of ' + str(self.current_map) + ' failed: ' + str(e))
+                self.__finish_map()
+                has_work = True
+
+            if not has_work:
+                await asyncio.sleep(self.interval)
+
+
+    # Refreshes the next map's beatmap and leaderboard, or downloads one of its replays. Returns False if there was nothing to prefetch
+    async def __step(self):
+        if self.current_map == None:
+            self.current_map = self.__next_map()
+            if self.current_map == None: return False
+
+            # Refreshes the leaderboard and the beatmap file if they are out of date
+            await OsuOnlineAsync.fetch_beatmap_file(self.current_map)
+            scores = await OsuOnlineAsync.fetch_scores(self.current_map, 'osu')
+
+            # The replay cache is on disk and shared with the job threads; look it up off the event loop
+            loop    = asyncio.get_running_loop()
+            missing = await loop.run_in_executor(None, lambda: [ score for score in (scores or []) if not ReplayCache.has_replay(score['id']) ])
+
+            self.pending_scores = collections.deque(missing)
+            return True
+
+        if not self.pending_scores:
+            self.__finish_map()
+            return True
+
+        score = self.pending_scores.popleft()
+        await OsuOnlineAsync.fetch_replay_file(score['beatmap']['mode'], score['id'])
+        return True
+
+
+    def __finish_map(self):
+        if self.current_map != None:
+            self.last_prefetch[self.current_map] = time.time()
+
+        self.current_map    = None
+        self.pending_scores = collections.deque()
+
+
+    # Most requested map, most recently requested first among equals, that was not prefetched lately
+    def __next_map(self):
+        now = time.time()
+        candidates = [
+            (num_requests, last_request, beatmap_id) for beatmap_id, (num_requests, last_request) in list(self.requests.items())
+            if now - self.last_prefetch.get(beatmap_id, 0) > self.refresh_interval
+        ]
+
+        if not candidates: return None
+        return max(candidates)[2]
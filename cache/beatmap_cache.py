@@ -0,0 +1,117 @@
+import threading
+import time
+
+from cache.disk_cache import DiskCache
+from file.beatmap_io import BeatmapIO
+
+
+'''
+Description: On-disk cache of downloaded beatmap files
+
+Beatmaps are stored by beatmap id along with their md5 and the ETag and Last-Modified
+headers they were served with. A stored beatmap is used without asking the server
+when it matches the md5 the caller expects, or when no md5 is known and it was
+validated recently. Otherwise the headers are used to revalidate it with a
+conditional request, which costs no download if the beatmap did not change.
+
+Input:
+    get_beatmap - look up a beatmap by id
+    put_beatmap - store a downloaded beatmap
+    touch_beatmap - mark a stored beatmap as validated
+
+Output:
+    Contents of the .osu file as bytes
+'''
+class BeatmapCache():
+
+    path     = 'data/beatmaps'
+    max_size = 256*1024*1024  # bytes
+    max_age  = 24*60*60       # seconds; how long a beatmap is used without revalidating when its md5 is not known
+
+    disk_cache = None
+    lock       = threading.Lock()  # guards creating the disk cache; jobs run on several threads
+
+    """
+    Args:
+        beatmap_id: (int) id of the beatmap
+
+    Returns:
+        (beatmap_data, meta), or None if the beatmap is not stored. meta has the beatmap's
+        md5, etag, last_modified and the time it was last validated at.
+    """
+    @staticmethod
+    def get_beatmap(beatmap_id):
+        disk_cache = BeatmapCache.get_disk_cache()
+        key = str(beatmap_id)
+
+        meta = disk_cache.get_meta(key)
+        if meta == None: return None
+
+        beatmap_data = disk_cache.get(key)
+        if beatmap_data == None: return None
+
+        # Don't serve a file that got corrupted on disk
+        if BeatmapIO.get_md5(beatmap_data) != meta['md5']:
+            disk_cache.remove(key)
+            return None
+
+        return beatmap_data, meta
+
+
+    """
+    Args:
+        beatmap_id: (int) id of the beatmap
+        beatmap_data: (bytes) contents of the .osu file
+        etag: (string) ETag header the beatmap was served with, if any
+        last_modified: (string) Last-Modified header the beatmap was served with, if any
+    """
+    @staticmethod
+    def put_beatmap(beatmap_id, beatmap_data, etag=None, last_modified=None):
+        meta = {
+            'md5'           : BeatmapIO.get_md5(beatmap_data),
+            'etag'          : etag,
+            'last_modified' : last_modified,
+            'validated'     : time.time(),
+        }
+        BeatmapCache.get_disk_cache().put(str(beatmap_id), beatmap_data, meta)
+
+
+    """
+    Call when the server confirmed the stored beatmap is still current
+
+    Args:
+        beatmap_id: (int) id of the beatmap
+    """
+    @staticmethod
+    def touch_beatmap(beatmap_id):
+        disk_cache = BeatmapCache.get_disk_cache()
+        key = str(beatmap_id)
+
+        meta = disk_cache.get_meta(key)
+        if meta == None: return
+
+        # Only the index changes; the file was just confirmed to be current
+        disk_cache.put_meta(key, dict(meta, validated=time.time()))
+
+
+    """
+    Args:
+        meta: (dict) metadata as returned by get_beatmap
+        beatmap_md5: (string) md5 the beatmap is expected to have, if known
+
+    Returns:
+        True if the stored beatmap can be used without asking the server
+    """
+    @staticmethod
+    def is_fresh(meta, beatmap_md5=None):
+        if beatmap_md5 != None:
+            return meta['md5'] == beatmap_md5
+        return time.time() - meta['validated'] < BeatmapCache.max_age
+
+
+    @staticmethod
+    def get_disk_cache():
+        with BeatmapCache.lock:
+            if not BeatmapCache.disk_cache:
+                BeatmapCache.disk_cache = DiskCache(BeatmapCache.path, BeatmapCache.max_size)
+            return BeatmapCache.disk_cache
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+'''
+Description: Size-bounded key-value store of bytes kept on disk
+
+Every entry is a file in the cache's directory. An index file keeps track of each
+entry's size, creation time, last access time and metadata. When the total size goes
+over the quota, the least recently used entries are evicted. Entries older than
+the time to live are treated as missing and removed.
+
+Files are written to a temporary file first and then moved in place, so a crash
+never leaves a partially written entry or index behind.
+
+Reads only update the last access time in memory. The index is written out along with
+the next write, or by a read once save_interval seconds passed since it was last
+written, so a hit doesn't cost a rewrite of the whole index.
+
+Input:
+    path - directory to keep the entries in
+    max_size - quota in bytes; None for no quota
+    ttl - seconds an entry lives for after it is written; None to never expire
+
+Output:
+    get/put - read and write entries by key
+    put_meta - update the metadata of an entry in place
+'''
+class DiskCache():
+
+    INDEX_FILENAME = 'index.json'
+
+    save_interval = 60  # seconds; longest a read's access time stays only in memory
+
+    def __init__(self, path, max_size=None, ttl=None):
+        self.path     = path
+        self.max_size = max_size
+        self.ttl      = ttl
+
+        self.lock  = threading.RLock()
+        self.index = None
+
+        self.index_dirty     = False  # access times changed since the index was last written
+        self.index_save_time = time.time()
+
+
+    """
+    Args:
+        key: (string) key of the entry
+
+    Returns:
+        Contents of the entry, or None if it is not cached or has expired
+    """
+    def get(self, key):
+        with self.lock:
+            entry = self.__get_entry(key)
+            if entry == None: return None
+
+            try:
+                with open(os.path.join(self.path, entry['filename']), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                self.__remove_entry(key)
+                self.__save_index()
+                return None
+
+            entry['last_access'] = time.time()
+            self.index_dirty = True
+
+            if time.time() - self.index_save_time >= self.save_interval:
+                self.__save_index()
+
+            return data
+
+
+    """
+    Args:
+        key: (string) key of the entry
+
+    Returns:
+        Metadata stored along with the entry, or None if it is not cached or has expired
+    """
+    def get_meta(self, key):
+        with self.lock:
+            entry = self.__get_entry(key)
+            return entry['meta'] if entry != None else None
+
+
+    """
+    Args:
+        key: (string) key of the entry
+
+    Returns:
+        Seconds since the entry was written, or None if it is not cached or has expired
+    """
+    def get_age(self, key):
+        with self.lock:
+            entry = self.__get_entry(key)
+            return time.time() - entry['created'] if entry != None else None
+
+
+    """
+    Args:
+        key: (string) key of the entry
+        data: (bytes) contents of the entry
+        meta: (dict) json serializable data to keep in the index along with the entry
+    """
+    def put(self, key, data, meta=None):
+        with self.lock:
+            self.__load_index()
+
+            filename = hashlib.sha1(key.encode('utf-8')).hexdigest()
+            self.__write_atomic(os.path.join(self.path, filename), data)
+
+            self.index[key] = {
+                'filename'    : filename,
+                'size'        : len(data),
+                'created'     : time.time(),
+                'last_access' : time.time(),
+                'meta'        : meta,
+            }
+
+            self.__evict()
+            self.__save_index()
+
+
+    """
+    Replaces the metadata of an entry without rewriting its contents
+
+    Args:
+        key: (string) key of the entry
+        meta: (dict) json serializable data to keep in the index along with the entry
+
+    Returns:
+        True if the entry was updated, False if it is not cached or has expired
+    """
+    def put_meta(self, key, meta):
+        with self.lock:
+            entry = self.__get_entry(key)
+            if entry == None: return False
+
+            entry['meta']        = meta
+            entry['last_access'] = time.time()
+
+            self.__save_index()
+            return True
+
+
+    """
+    Args:
+        key: (string) key of the entry to remove
+    """
+    def remove(self, key):
+        with self.lock:
+            self.__load_index()
+            if not key in self.index: return
+
+            self.__remove_entry(key)
+            self.__save_index()
+
+
+    """
+    Writes access times only kept in memory so far to the index
+    """
+    def flush(self):
+        with self.lock:
+            if self.index_dirty:
+                self.__save_index()
+
+
+    """
+    Returns:
+        Keys of all entries in the cache, including expired ones that were not removed yet
+    """
+    def keys(self):
+        with self.lock:
+            self.__load_index()
+            return list(self.index.keys())
+
+
+    """
+    Returns:
+        Total size in bytes of all entries in the cache
+    """
+    def get_size(self):
+        with self.lock:
+            self.__load_index()
+            return sum(entry['size'] for entry in self.index.values())
+
+
+    def __get_entry(self, key):
+        self.__load_index()
+        if not key in self.index: return None
+
+        entry = self.index[key]
+        if self.ttl != None and time.time() - entry['created'] > self.ttl:
+            self.__remove_entry(key)
+            self.__save_index()
+            return None
+
+        return entry
+
+
+    def __remove_entry(self, key):
+        entry = self.index.pop(key)
+
+        try: os.remove(os.path.join(self.path, entry['filename']))
+        except OSError: pass
+
+
+    # Removes least recently used entries until the cache is within its quota
+    def __evict(self):
+        if self.max_size == None: return
+
+        total_size = sum(entry['size'] for entry in self.index.values())
+        lru_keys   = sorted(self.index.keys(), key=lambda key: self.index[key]['last_access'])
+
+        for key in lru_keys:
+            if total_size <= self.max_size: break
+
+            total_size -= self.index[key]['size']
+            self.__remove_entry(key)
+
+
+    def __load_index(self):
+        if self.index != None: return
+
+        try:
+            with open(os.path.join(self.path, DiskCache.INDEX_FILENAME), 'rt', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+
+    def __save_index(self):
+        data = json.dumps(self.index).encode('utf-8')
+        self.__write_atomic(os.path.join(self.path, DiskCache.INDEX_FILENAME), data)
+
+        self.index_dirty     = False
+        self.index_save_time = time.time()
+
+
+    def __write_atomic(self, filepath, data):
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+
+        fd, tmp_filepath = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_filepath, filepath)
+        except:
+            os.remove(tmp_filepath)
+            raise
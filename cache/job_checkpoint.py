@@ -0,0 +1,154 @@
+import io
+import threading
+
+from cache.disk_cache import DiskCache
+
+
+'''
+Description: Keeps the progress of unfinished jobs on disk
+
+Two things are checkpointed, so a restarted bot can pick up where it left off:
+    - the requests waiting on a job: which channel asked for which beatmap, and who asked
+    - the per-score data of each replay processed so far, stored as soon as the replay is scored
+
+Input:
+    add_request/remove_request - record and forget a request for a beatmap
+    put_score_data - store the data of one scored replay
+
+Output:
+    get_requests - requests that were not answered yet
+    get_score_data - data of the replays processed so far
+'''
+class JobCheckpoint():
+
+    path = 'data/jobs'
+    ttl  = 7*24*60*60  # seconds; checkpoints of jobs abandoned for this long are dropped
+
+    disk_cache = None
+    lock       = threading.Lock()  # guards creating the disk cache; jobs run on several threads
+
+    """
+    Args:
+        beatmap_id: (int) id of the requested beatmap
+        channel_id: (int) id of the channel to send the result to
+        user_id: (int) id of the user who requested the beatmap
+    """
+    @staticmethod
+    def add_request(beatmap_id, channel_id, user_id):
+        disk_cache = JobCheckpoint.get_disk_cache()
+        key = 'request/' + str(beatmap_id)
+
+        # Requests for the same beatmap can be added from several threads at once
+        with disk_cache.lock:
+            meta = disk_cache.get_meta(key) or { 'beatmap_id' : int(beatmap_id), 'requests' : [] }
+            if not [ channel_id, user_id ] in meta['requests']:
+                meta['requests'].append([ channel_id, user_id ])
+
+            disk_cache.put(key, b'', meta)
+
+
+    """
+    Args:
+        beatmap_id: (int) id of the beatmap whose requests were answered
+    """
+    @staticmethod
+    def remove_request(beatmap_id):
+        JobCheckpoint.get_disk_cache().remove('request/' + str(beatmap_id))
+
+
+    """
+    Returns:
+        { beatmap_id : [ (channel_id, user_id), ... ] } for every beatmap with unanswered requests
+    """
+    @staticmethod
+    def get_requests():
+        disk_cache = JobCheckpoint.get_disk_cache()
+        requests   = {}
+
+        for key in disk_cache.keys():
+            if not key.startswith('request/'): continue
+
+            meta = disk_cache.get_meta(key)
+            if meta == None: continue
+
+            requests[meta['beatmap_id']] = [ tuple(request) for request in meta['requests'] ]
+
+        return requests
+
+
+    """
+    Args:
+        beatmap_id: (int) id of the beatmap
+        beatmap_md5: (string) md5 of the beatmap the replay was scored on
+        score_id: (int) id of the score
+        score_data: (numpy.array) [ [ time, hit_offset ], ... N hitobjects ]
+    """
+    @staticmethod
+    def put_score_data(beatmap_id, beatmap_md5, score_id, score_data):
+        # numpy is only needed once a job runs, not to look up requests at startup
+        import numpy as np
+
+        data = io.BytesIO()
+        np.save(data, np.asarray(score_data, dtype=float))
+
+        meta = { 'beatmap_md5' : beatmap_md5, 'score_id' : score_id }
+        JobCheckpoint.get_disk_cache().put(JobCheckpoint.__get_score_prefix(beatmap_id) + str(score_id), data.getvalue(), meta)
+
+
+    """
+    Args:
+        beatmap_id: (int) id of the beatmap
+        beatmap_md5: (string) only data scored on this version of the beatmap is returned
+
+    Returns:
+        { score_id : [ [ time, hit_offset ], ... N hitobjects ] } for every replay checkpointed
+    """
+    @staticmethod
+    def get_score_data(beatmap_id, beatmap_md5):
+        import numpy as np
+
+        disk_cache = JobCheckpoint.get_disk_cache()
+        prefix     = JobCheckpoint.__get_score_prefix(beatmap_id)
+        score_data = {}
+
+        for key in disk_cache.keys():
+            if not key.startswith(prefix): continue
+
+            meta = disk_cache.get_meta(key)
+            if meta == None or meta['beatmap_md5'] != beatmap_md5: continue
+
+            data = disk_cache.get(key)
+            if data == None: continue
+
+            score_data[meta['score_id']] = np.load(io.BytesIO(data))
+
+        return score_data
+
+
+    """
+    Call once the result of the beatmap is stored elsewhere
+
+    Args:
+        beatmap_id: (int) id of the beatmap
+    """
+    @staticmethod
+    def remove_score_data(beatmap_id):
+        disk_cache = JobCheckpoint.get_disk_cache()
+        prefix     = JobCheckpoint.__get_score_prefix(beatmap_id)
+
+        for key in disk_cache.keys():
+            if key.startswith(prefix):
+                disk_cache.remove(key)
+
+
+    @staticmethod
+    def get_disk_cache():
+        with JobCheckpoint.lock:
+            if not JobCheckpoint.disk_cache:
+                JobCheckpoint.disk_cache = DiskCache(JobCheckpoint.path, ttl=JobCheckpoint.ttl)
+            return JobCheckpoint.disk_cache
+
+
+    @staticmethod
+    def __get_score_prefix(beatmap_id):
+        return 'score/' + str(beatmap_id) + '/'
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+
+from misc.stats import Stats
+
+
+'''
+Description: In-memory cache of beatmap leaderboards with stale-while-revalidate
+
+Leaderboards are stored by (beatmap id, gamemode, leaderboard type). A leaderboard
+younger than ttl is served as is. One younger than stale_ttl is served as well, but
+a refresh is started in the background so the next request gets a fresh one. Older
+leaderboards are fetched again before being served.
+
+Input:
+    get_scores/get_scores_async - look up a leaderboard, fetching it if needed
+
+Output:
+    List of score data as returned by the osu! website
+'''
+class LeaderboardCache():
+
+    ttl       = 60     # seconds a leaderboard is served without refreshing it
+    stale_ttl = 10*60  # seconds a leaderboard is served while it's being refreshed in the background
+
+    lock       = threading.Lock()
+    entries    = {}     # key -> (fetch time, scores)
+    refreshing = set()  # keys being refreshed in the background
+
+    """
+    Args:
+        key: (tuple) (beatmap id, gamemode, leaderboard type)
+        fetch: (function) takes no arguments and returns the leaderboard, or None if it could not be fetched
+
+    Returns:
+        The leaderboard
+    """
+    @staticmethod
+    def get_scores(key, fetch):
+        scores, is_fresh = LeaderboardCache.__lookup(key)
+        if scores == None:
+            return LeaderboardCache.__refresh(key, fetch)
+
+        if not is_fresh:
+            LeaderboardCache.__refresh_async(key, fetch)
+
+        return scores
+
+
+    """
+    Same as get_scores, for use on an event loop. The background refresh of a stale
+    leaderboard runs as a task on the loop.
+
+    Args:
+        key: (tuple) (beatmap id, gamemode, leaderboard type)
+        fetch: (coroutine function) takes no arguments and returns the leaderboard, or None if it could not be fetched
+
+    Returns:
+        The leaderboard
+    """
+    @staticmethod
+    async def get_scores_async(key, fetch):
+        scores, is_fresh = LeaderboardCache.__lookup(key)
+        if scores == None:
+            return LeaderboardCache.__store(key, await fetch())
+
+        if not is_fresh and LeaderboardCache.__start_refresh(key):
+            async def refresh():
+                try: LeaderboardCache.__store(key, await fetch())
+                except Exception as e:
+                    print('Unable to refresh leaderboard ' + str(key) + ': ' + str(e))
+                finally:
+                    LeaderboardCache.__end_refresh(key)
+
+            asyncio.ensure_future(refresh())
+
+        return scores
+
+
+    """
+    Args:
+        key: (tuple) (beatmap id, gamemode, leaderboard type)
+    """
+    @staticmethod
+    def remove(key):
+        with LeaderboardCache.lock:
+            LeaderboardCache.entries.pop(key, None)
+
+
+    # Returns (scores, is_fresh), or (None, False) if the leaderboard has to be fetched before it can be served
+    @staticmethod
+    def __lookup(key):
+        with LeaderboardCache.lock:
+            entry = LeaderboardCache.entries.get(key)
+
+        if entry != None:
+            fetch_time, scores = entry
+            age = time.time() - fetch_time
+
+            if age < LeaderboardCache.ttl:
+                Stats.increment('leaderboard_cache_hit')
+                return scores, True
+
+            if age < LeaderboardCache.stale_ttl:
+                Stats.increment('leaderboard_cache_hit')
+                Stats.increment('leaderboard_cache_stale')
+                return scores, False
+
+        Stats.increment('leaderboard_cache_miss')
+        return None, False
+
+
+    @staticmethod
+    def __refresh(key, fetch):
+        return LeaderboardCache.__store(key, fetch())
+
+
+    @staticmethod
+    def __store(key, scores):
+        if scores == None: return None
+
+        with LeaderboardCache.lock:
+            LeaderboardCache.entries[key] = (time.time(), scores)
+
+            # Drop leaderboards too old to be served at all
+            now = time.time()
+            for old_key in [ k for k, (fetch_time, _) in LeaderboardCache.entries.items() if now - fetch_time > LeaderboardCache.stale_ttl ]:
+                del LeaderboardCache.entries[old_key]
+
+        return scores
+
+
+    @staticmethod
+    def __refresh_async(key, fetch):
+        if not LeaderboardCache.__start_refresh(key): return
+
+        def refresh():
+            try: LeaderboardCache.__refresh(key, fetch)
+            except Exception as e:
+                print('Unable to refresh leaderboard ' + str(key) + ': ' + str(e))
+            finally:
+                LeaderboardCache.__end_refresh(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+    # Returns False if the leaderboard is already being refreshed
+    @staticmethod
+    def __start_refresh(key):
+        with LeaderboardCache.lock:
+            if key in LeaderboardCache.refreshing: return False
+            LeaderboardCache.refreshing.add(key)
+            return True
+
+
+    @staticmethod
+    def __end_refresh(key):
+        with LeaderboardCache.lock:
+            LeaderboardCache.refreshing.discard(key)
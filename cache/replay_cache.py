@@ -0,0 +1,117 @@
+import hashlib
+import threading
+
+from cache.disk_cache import DiskCache
+from file.replay_io import ReplayIO
+
+
+'''
+Description: Persistent on-disk store of downloaded replays
+
+Replays are stored by the sha256 of their contents, so the same replay is never stored
+twice and a corrupted file is detected when read. The index maps each entry to the
+score ids it was downloaded for and the replay's own md5. The store is bounded by a
+disk quota and evicts the least recently used replays.
+
+Input:
+    get_replay - look up a replay by score id
+    put_replay - store a downloaded replay
+
+Output:
+    Contents of the .osr file as bytes
+'''
+class ReplayCache():
+
+    path     = 'data/replays'
+    max_size = 1024*1024*1024  # bytes
+
+    disk_cache = None
+    score_ids  = None  # score id -> content digest
+    lock       = threading.Lock()
+
+    """
+    Args:
+        score_id: (int) id of the score the replay is of
+
+    Returns:
+        Contents of the .osr file, or None if the replay is not stored
+    """
+    @staticmethod
+    def get_replay(score_id):
+        with ReplayCache.lock:
+            ReplayCache.__load()
+
+            digest = ReplayCache.score_ids.get(str(score_id))
+            if digest == None: return None
+
+            data = ReplayCache.disk_cache.get(digest)
+            if data == None or hashlib.sha256(data).hexdigest() != digest:
+                # Evicted or corrupted
+                del ReplayCache.score_ids[str(score_id)]
+                ReplayCache.disk_cache.remove(digest)
+                return None
+
+            return data
+
+
+    """
+    Args:
+        score_id: (int) id of the score the replay is of
+        replay_data: (bytes) contents of the .osr file
+    """
+    @staticmethod
+    def put_replay(score_id, replay_data):
+        with ReplayCache.lock:
+            ReplayCache.__load()
+
+            digest = hashlib.sha256(replay_data).hexdigest()
+            meta   = ReplayCache.disk_cache.get_meta(digest)
+
+            if meta == None:
+                meta = { 'score_ids' : [], 'replay_hash' : ReplayIO.load_replay_hash(replay_data) }
+            if not str(score_id) in meta['score_ids']:
+                meta['score_ids'].append(str(score_id))
+
+            ReplayCache.disk_cache.put(digest, replay_data, meta)
+            ReplayCache.score_ids[str(score_id)] = digest
+
+            # Storing the replay may have evicted others
+            digests = set(ReplayCache.disk_cache.keys())
+            for stored_score_id in [ stored_score_id for stored_score_id, stored_digest in ReplayCache.score_ids.items() if not stored_digest in digests ]:
+                del ReplayCache.score_ids[stored_score_id]
+
+
+    """
+    Args:
+        score_id: (int) id of the score
+
+    Returns:
+        True if the replay of the score is stored
+    """
+    @staticmethod
+    def has_replay(score_id):
+        with ReplayCache.lock:
+            ReplayCache.__load()
+
+            digest = ReplayCache.score_ids.get(str(score_id))
+            if digest == None: return False
+
+            if ReplayCache.disk_cache.get_meta(digest) == None:
+                # Evicted or expired
+                del ReplayCache.score_ids[str(score_id)]
+                return False
+
+            return True
+
+
+    # Builds the score id lookup from the index on first use
+    @staticmethod
+    def __load():
+        if ReplayCache.disk_cache != None: return
+
+        ReplayCache.disk_cache = DiskCache(ReplayCache.path, ReplayCache.max_size)
+        ReplayCache.score_ids  = {}
+
+        for digest in ReplayCache.disk_cache.keys():
+            for score_id in ReplayCache.disk_cache.get_meta(digest)['score_ids']:
+                ReplayCache.score_ids[score_id] = digest
@@ -0,0 +1,117 @@
+import io
+import threading
+import numpy as np
+
+from cache.disk_cache import DiskCache
+
+
+'''
+Description: On-disk cache of per-hitobject hit offset results
+
+Results are stored by beatmap id along with the md5 of the beatmap and the ids of
+the scores the result was calculated from. The time and hit offset of every score
+at every hitobject is stored as well, so the result can be updated when only some
+of the scores change.
+
+Input:
+    get_result - look up the result for a beatmap
+    get_score_data - look up the per-score data the result was calculated from
+    put_result - store the result for a beatmap
+
+Output:
+    (times, hit_offsets) as returned by StdScoreMetrics.trans_solve_for_hit_offset
+'''
+class ResultCache():
+
+    path     = 'data/results'
+    max_size = 256*1024*1024  # bytes
+    ttl      = 7*24*60*60     # seconds; how long results are kept around for incremental updates
+    max_age  = 60*60          # seconds; how long results are served without checking the leaderboard
+
+    disk_cache = None
+    lock       = threading.Lock()  # guards creating the disk cache; jobs run on several threads
+
+    """
+    Args:
+        beatmap_id: (int) id of the beatmap
+        beatmap_md5: (string) if given, the result must have been calculated from this version of the beatmap
+        score_ids: (iterable) if given, the result must have been calculated from exactly these scores
+        max_age: (float) if given, the result must have been calculated at most this many seconds ago
+
+    Returns:
+        (times, hit_offsets), or None if there is no matching result
+    """
+    @staticmethod
+    def get_result(beatmap_id, beatmap_md5=None, score_ids=None, max_age=None):
+        result = ResultCache.__load(beatmap_id, beatmap_md5, score_ids, max_age)
+        if result == None: return None
+
+        meta, data = result
+        return data['times'], data['hit_offsets']
+
+
+    """
+    Args:
+        beatmap_id: (int) id of the beatmap
+        beatmap_md5: (string) the data must have been calculated from this version of the beatmap
+
+    Returns:
+        { score_id : [ [ time, hit_offset ], ... N hitobjects ] } for every score the stored
+        result was calculated from. Empty if there is no stored result.
+    """
+    @staticmethod
+    def get_score_data(beatmap_id, beatmap_md5):
+        result = ResultCache.__load(beatmap_id, beatmap_md5)
+        if result == None: return {}
+
+        meta, data = result
+        return { score_id : score_data for score_id, score_data in zip(meta['score_ids'], data['score_data']) }
+
+
+    """
+    Args:
+        beatmap_id: (int) id of the beatmap
+        beatmap_md5: (string) md5 of the beatmap the result was calculated from
+        score_ids: (list) ids of the scores the result was calculated from
+        times: (numpy.array) hitobject times
+        hit_offsets: (numpy.array) per-hitobject hit offsets
+        score_data: (list) [ [ time, hit_offset ], ... N hitobjects ] for each score in score_ids
+    """
+    @staticmethod
+    def put_result(beatmap_id, beatmap_md5, score_ids, times, hit_offsets, score_data):
+        data = io.BytesIO()
+        np.savez(data, 
+            times       = np.asarray(times, dtype=float), 
+            hit_offsets = np.asarray(hit_offsets, dtype=float),
+            score_data  = np.asarray(score_data, dtype=float)
+        )
+
+        meta = { 'beatmap_md5' : beatmap_md5, 'score_ids' : list(score_ids) }
+        ResultCache.get_disk_cache().put(str(beatmap_id), data.getvalue(), meta)
+
+
+    @staticmethod
+    def get_disk_cache():
+        with ResultCache.lock:
+            if not ResultCache.disk_cache:
+                ResultCache.disk_cache = DiskCache(ResultCache.path, ResultCache.max_size, ResultCache.ttl)
+            return ResultCache.disk_cache
+
+
+    @staticmethod
+    def __load(beatmap_id, beatmap_md5=None, score_ids=None, max_age=None):
+        disk_cache = ResultCache.get_disk_cache()
+        key = str(beatmap_id)
+
+        meta = disk_cache.get_meta(key)
+        if meta == None: return None
+
+        if beatmap_md5 != None and meta['beatmap_md5'] != beatmap_md5:      return None
+        if score_ids   != None and set(meta['score_ids']) != set(score_ids): return None
+        if max_age     != None and disk_cache.get_age(key) > max_age:        return None
+
+        data = disk_cache.get(key)
+        if data == None: return None
+
+        with np.load(io.BytesIO(data)) as result:
+            return meta, { name : result[name] for name in result.files }
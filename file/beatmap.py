@@ -1,4 +1,5 @@
 from misc.math_utils import find
+from std.std_hitobject import Hitobject
 
 '''
 Description: Provides a manupilation interface for beatmaps
@@ -9,6 +10,7 @@ Input:
 Output:
     hitobjects - list of hitobjects present in the map
     timingpoints - list of timing points present in the map
+    hitobject_table - optional columnar form of the hitobjects, in place of the list
 '''
 class Beatmap():
 
@@ -56,6 +58,56 @@ class Beatmap():
             self.st = None
 
 
+    '''
+    Struct-of-arrays form of the hitobjects, one numpy array per column and one row per
+    hitobject. Built by BeatmapIO.load_beatmap when asked for, in place of the hitobject
+    list: circles and spinners are only rows of the table, and Beatmap.hitobjects and
+    Beatmap.end_times are left empty. Sliders still need objects for their curves; those
+    are kept in sliders, in the order of the slider rows.
+
+    Columns that don't apply to a hitobject's type hold the values below:
+        end_time - time for circles
+        repeat - 0 for circles and spinners
+        pixel_length - 0 for circles and spinners
+    '''
+    class HitobjectTable():
+
+        def __init__(self):
+            self.time         = None    # int64
+            self.end_time     = None    # int64
+            self.x            = None    # float64
+            self.y            = None    # float64
+            self.type         = None    # int32; Hitobject type flags
+            self.repeat       = None    # int32
+            self.pixel_length = None    # float64
+
+            self.sliders = []           # StdHoldNoteHitobject of each slider row
+
+
+        def __len__(self):
+            return 0 if self.time is None else len(self.time)
+
+
+        """
+        Args:
+            hitobject_type: (int) Hitobject type flags to test for
+
+        Returns:
+            Boolean mask of the rows that are of the hitobject type
+        """
+        def is_hitobject_type(self, hitobject_type):
+            return (self.type & hitobject_type) > 0
+
+
+        """
+        Returns:
+            Boolean mask of the rows of the objects in sliders. A row flagged as both a circle
+            and a slider is loaded as a circle.
+        """
+        def is_slider(self):
+            return self.is_hitobject_type(Hitobject.SLIDER) & ~self.is_hitobject_type(Hitobject.CIRCLE)
+
+
     def __init__(self):
         self.metadata   = Beatmap.Metadata()
         self.difficulty = Beatmap.Difficulty()
@@ -66,6 +118,8 @@ class Beatmap():
         self.end_times         = []
         self.slider_tick_times = []
 
+        self.hitobject_table = None     # Beatmap.HitobjectTable, if BeatmapIO.load_beatmap was asked to build it instead of hitobjects
+
         self.bpm_min = float('inf')
         self.bpm_max = float('-inf')
 
@@ -75,6 +129,8 @@ class Beatmap():
         The number of hitobjects the beatmap has
     """
     def get_num_hitobjects(self):
+        if self.hitobject_table is not None:
+            return len(self.hitobject_table)
         return len(self.hitobjects)
 
 
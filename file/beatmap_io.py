@@ -1,3 +1,5 @@
+import hashlib
+import re
 from collections import OrderedDict
 
 from misc.math_utils import find
@@ -37,16 +39,51 @@ class BeatmapIO():
         SECTION_HITOBJECTS   = 8
 
 
+    SECTION_HEADERS = {
+        '[General]'      : Section.SECTION_GENERAL,
+        '[Editor]'       : Section.SECTION_EDITOR,
+        '[Metadata]'     : Section.SECTION_METADATA,
+        '[Difficulty]'   : Section.SECTION_DIFFICULTY,
+        '[Events]'       : Section.SECTION_EVENTS,
+        '[TimingPoints]' : Section.SECTION_TIMINGPOINTS,
+        '[Colours]'      : Section.SECTION_COLOURS,
+        '[HitObjects]'   : Section.SECTION_HITOBJECTS,
+    }
+
+    SECTION_HEADER_PATTERN = re.compile(r'^[ \t]*(\[[A-Za-z]+\])[ \t]*\r?$', re.MULTILINE)
+
+    # Sections whose lines are not used. They are skipped over without being parsed.
+    IGNORED_SECTIONS = [ Section.SECTION_EDITOR, Section.SECTION_EVENTS, Section.SECTION_COLOURS ]
+
+    METADATA_KEYS = {
+        'Title'        : 'title',
+        'Artist'       : 'artist',
+        'Creator'      : 'creator',
+        'Version'      : 'version',
+        'BeatmapID'    : 'beatmap_id',
+        'BeatmapSetID' : 'beatmapset_id',
+    }
+
+    DIFFICULTY_KEYS = {
+        'HPDrainRate'       : 'hp',
+        'CircleSize'        : 'cs',
+        'OverallDifficulty' : 'od',
+        'ApproachRate'      : 'ar',
+        'SliderMultiplier'  : 'sm',
+        'SliderTickRate'    : 'st',
+    }
+
+    SECTION_MAP = None
+
+    # Deferred until the first beatmap is loaded
     @staticmethod
     def init():
+        # Parsers taking all lines of a section at once
         BeatmapIO.SECTION_MAP = {
             BeatmapIO.Section.SECTION_GENERAL      : BeatmapIO.__parse_general_section,
-            BeatmapIO.Section.SECTION_EDITOR       : BeatmapIO.__parse_editor_section,
             BeatmapIO.Section.SECTION_METADATA     : BeatmapIO.__parse_metadata_section,
             BeatmapIO.Section.SECTION_DIFFICULTY   : BeatmapIO.__parse_difficulty_section,
-            BeatmapIO.Section.SECTION_EVENTS       : BeatmapIO.__parse_events_section,
             BeatmapIO.Section.SECTION_TIMINGPOINTS : BeatmapIO.__parse_timingpoints_section,
-            BeatmapIO.Section.SECTION_COLOURS      : BeatmapIO.__parse_colour_section,
             BeatmapIO.Section.SECTION_HITOBJECTS   : BeatmapIO.__parse_hitobjects_section
         }
 
@@ -56,11 +93,12 @@ class BeatmapIO():
 
     Args:
         filepath: (string) filepath to the beatmap file to load
+        hitobject_table: (bool) build beatmap.hitobject_table in place of beatmap.hitobjects
     """
     @staticmethod
-    def open_beatmap(filepath=None):
+    def open_beatmap(filepath=None, hitobject_table=False):
         with open(filepath, 'rt', encoding='utf-8') as beatmap_file:
-            beatmap = BeatmapIO.load_beatmap(beatmap_file)
+            beatmap = BeatmapIO.load_beatmap(beatmap_file, hitobject_table)
         
         return beatmap
 
@@ -70,17 +108,30 @@ class BeatmapIO():
 
     Args:
         beatmap_file: (string) contents of the beatmap file
+        hitobject_table: (bool) build beatmap.hitobject_table; circles and spinners are then only rows of the
+            table and beatmap.hitobjects is left empty
     """
     @staticmethod
-    def load_beatmap(beatmap_data):
+    def load_beatmap(beatmap_data, hitobject_table=False):
+        if BeatmapIO.SECTION_MAP == None:
+            BeatmapIO.init()
+
         beatmap = Beatmap()
+
+        # The hitobjects parser fills in the table in place of the circle and spinner objects
+        if hitobject_table:
+            beatmap.hitobject_table = Beatmap.HitobjectTable()
         
         BeatmapIO.__parse_beatmap_data(beatmap_data, beatmap)
         BeatmapIO.__process_timing_points(beatmap)
 
         if beatmap.gamemode == Beatmap.GAMEMODE_OSU:
             BeatmapIO.__process_slider_timings(beatmap)
-            BeatmapIO.__process_hitobject_end_times(beatmap)
+
+            # The table's end_time column takes the place of beatmap.end_times
+            if hitobject_table: BeatmapIO.__process_hitobject_table(beatmap)
+            else:               BeatmapIO.__process_hitobject_end_times(beatmap)
+
             BeatmapIO.__process_slider_tick_times(beatmap)
 
         else:
@@ -104,24 +155,47 @@ class BeatmapIO():
 
 
     """
+    Args:
+        beatmap_data: (bytes, string or file) contents of the beatmap file
+
     Returns:
-        MD5 checksum of the beatmap file
+        MD5 checksum of the beatmap file, as osu! reports it in score and beatmap data
     """
     @staticmethod
-    def get_md5(beatmap):
-        pass
+    def get_md5(beatmap_data):
+        if hasattr(beatmap_data, 'read'):
+            beatmap_data = beatmap_data.read()
+
+        if isinstance(beatmap_data, str):
+            beatmap_data = beatmap_data.encode('utf-8')
+
+        return hashlib.md5(beatmap_data).hexdigest()
 
 
     @staticmethod
     def __process_hitobject_end_times(beatmap):
-        beatmap.end_times = {}
-        for i in range(len(beatmap.hitobjects)):
-            if not beatmap.hitobjects[i].is_hitobject_type(Hitobject.CIRCLE):
-                beatmap.end_times[beatmap.hitobjects[i].end_time] = i
-            else:
-                beatmap.end_times[beatmap.hitobjects[i].time] = i
+        end_times = { (hitobject.time if hitobject.hitobject_type & Hitobject.CIRCLE else hitobject.end_time) : i for i, hitobject in enumerate(beatmap.hitobjects) }
+        beatmap.end_times = OrderedDict(sorted(end_times.items()))
+
 
-        beatmap.end_times = OrderedDict(sorted(beatmap.end_times.items(), key=lambda x: x[0]))
+    @staticmethod
+    def __process_hitobject_table(beatmap):
+        # numpy is only needed by callers that ask for the table
+        import numpy as np
+
+        table = beatmap.hitobject_table
+
+        # No [HitObjects] lines to fill the columns in from
+        if table.time is None:
+            table.time         = np.zeros(0, dtype=np.int64)
+            table.end_time     = np.zeros(0, dtype=np.int64)
+            table.x            = np.zeros(0, dtype=np.float64)
+            table.y            = np.zeros(0, dtype=np.float64)
+            table.type         = np.zeros(0, dtype=np.int32)
+            table.repeat       = np.zeros(0, dtype=np.int32)
+            table.pixel_length = np.zeros(0, dtype=np.float64)
+
+        table.end_time[table.is_slider()] = [ slider.end_time for slider in table.sliders ]
 
 
     # Validates beatmap data
@@ -151,226 +225,145 @@ class BeatmapIO():
     def __parse_beatmap_content(beatmap_data, beatmap):
         if beatmap.metadata.beatmap_format == -1: return
 
-        section = BeatmapIO.Section.SECTION_NONE
-        line    = ''
-        
-        while True:
-            line = beatmap_data.readline()
-
-            if line.strip() == '[General]':        section = BeatmapIO.Section.SECTION_GENERAL
-            elif line.strip() == '[Editor]':       section = BeatmapIO.Section.SECTION_EDITOR
-            elif line.strip() == '[Metadata]':     section = BeatmapIO.Section.SECTION_METADATA
-            elif line.strip() == '[Difficulty]':   section = BeatmapIO.Section.SECTION_DIFFICULTY
-            elif line.strip() == '[Events]':       section = BeatmapIO.Section.SECTION_EVENTS
-            elif line.strip() == '[TimingPoints]': section = BeatmapIO.Section.SECTION_TIMINGPOINTS
-            elif line.strip() == '[Colours]':      section = BeatmapIO.Section.SECTION_COLOURS
-            elif line.strip() == '[HitObjects]':   section = BeatmapIO.Section.SECTION_HITOBJECTS
-            elif line == '':               
-                return
-            else:
-                BeatmapIO.__parse_section(section, line, beatmap)
+        # Section headers are found in one pass over the whole file. Only the sections that
+        # are parsed are split into lines; ignored sections are jumped over.
+        content = beatmap_data.read()
+        headers = [ match for match in BeatmapIO.SECTION_HEADER_PATTERN.finditer(content) if match.group(1) in BeatmapIO.SECTION_HEADERS ]
 
+        for i, match in enumerate(headers):
+            section = BeatmapIO.SECTION_HEADERS[match.group(1)]
+            if section in BeatmapIO.IGNORED_SECTIONS: continue
 
-    @staticmethod
-    def __parse_section(section, line, beatmap):
-        if section != BeatmapIO.Section.SECTION_NONE:
-            BeatmapIO.SECTION_MAP[section](line, beatmap)
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(content)
+            BeatmapIO.SECTION_MAP[section](content[match.end():end].splitlines(), beatmap)
 
 
+    # Yields (key, value) of every "key: value" line
     @staticmethod
-    def __parse_general_section(line, beatmap):
-        data = line.split(':', 1)
-        if len(data) < 2: return
-        data[0] = data[0].strip()
+    def __get_key_values(lines):
+        for line in lines:
+            data = line.split(':', 1)
+            if len(data) < 2: continue
 
-        if data[0] == 'PreviewTime':
-            # ignore
-            return
-
-        if data[0] == 'Countdown':
-            # ignore
-            return
-
-        if data[0] == 'SampleSet':
-            # ignore
-            return
-
-        if data[0] == 'StackLeniency':
-            # ignore
-            return
-
-        if data[0] == 'Mode':
-            beatmap.gamemode = int(data[1])
-            return
-
-        if data[0] == 'LetterboxInBreaks':
-            # ignore
-            return
-
-        if data[0] == 'SpecialStyle':
-            # ignore
-            return
-
-        if data[0] == 'WidescreenStoryboard':
-            # ignore
-            return
+            yield data[0].strip(), data[1]
 
 
     @staticmethod
-    def __parse_editor_section(line, beatmap):
-        data = line.split(':', 1)
-        if len(data) < 2: return
-
-        if data[0] == 'DistanceSpacing':
-            # ignore
-            return
-
-        if data[0] == 'BeatDivisor':
-            # ignore
-            return
-
-        if data[0] == 'GridSize':
-            # ignore
-            return
-
-        if data[0] == 'TimelineZoom':
-            # ignore
-            return
+    def __parse_general_section(lines, beatmap):
+        for key, value in BeatmapIO.__get_key_values(lines):
+            if key == 'Mode':
+                beatmap.gamemode = int(value)
 
 
     @staticmethod
-    def __parse_metadata_section(line, beatmap):
-        data = line.split(':', 1)
-        if len(data) < 2: return
-        data[0] = data[0].strip()
-
-        if data[0] == 'Title':
-            beatmap.metadata.title = data[1].strip()
-            return
-
-        if data[0] == 'TitleUnicode':
-            # ignore
-            return
-
-        if data[0] == 'Artist':
-            beatmap.metadata.artist = data[1].strip()
-            return
-
-        if data[0] == 'ArtistUnicode':
-            # ignore
-            return
-
-        if data[0] == 'Creator':
-            beatmap.metadata.creator = data[1].strip()
-            return
-
-        if data[0] == 'Version':
-            beatmap.metadata.version = data[1].strip()
-            return
-
-        if data[0] == 'Source':
-            # ignore
-            return
-
-        if data[0] == 'Tags':
-            # ignore
-            return
-
-        if data[0] == 'BeatmapID':
-            beatmap.metadata.beatmap_id = data[1].strip()
-            return
-
-        if data[0] == 'BeatmapSetID':
-            beatmap.metadata.beatmapset_id = data[1].strip()
-            return
+    def __parse_metadata_section(lines, beatmap):
+        for key, value in BeatmapIO.__get_key_values(lines):
+            attribute = BeatmapIO.METADATA_KEYS.get(key)
+            if attribute != None:
+                setattr(beatmap.metadata, attribute, value.strip())
 
 
     @staticmethod
-    def __parse_difficulty_section(line, beatmap):
-        data = line.split(':', 1)
-        if len(data) < 2: return
-        data[0] = data[0].strip()
+    def __parse_difficulty_section(lines, beatmap):
+        for key, value in BeatmapIO.__get_key_values(lines):
+            attribute = BeatmapIO.DIFFICULTY_KEYS.get(key)
+            if attribute != None:
+                setattr(beatmap.difficulty, attribute, float(value))
 
-        if data[0] == 'HPDrainRate':
-            beatmap.difficulty.hp = float(data[1])
-            return
 
-        if data[0] == 'CircleSize':
-            beatmap.difficulty.cs = float(data[1])
-            return
+    @staticmethod
+    def __parse_timingpoints_section(lines, beatmap):
+        for line in lines:
+            data = line.split(',')
+            if len(data) < 2: continue
 
-        if data[0] == 'OverallDifficulty':
-            beatmap.difficulty.od = float(data[1])
-            return
+            timing_point = Beatmap.TimingPoint()
+            
+            timing_point.offset        = float(data[0])
+            timing_point.beat_interval = float(data[1])
 
-        if data[0] == 'ApproachRate':
-            beatmap.difficulty.ar = float(data[1])
-            return
+            # Old maps don't have meteres
+            if len(data) > 2: timing_point.meter = int(data[2])
+            else:             timing_point.meter = 4
 
-        if data[0] == 'SliderMultiplier':
-            beatmap.difficulty.sm = float(data[1])
-            return
+            if len(data) > 6: timing_point.inherited = False if int(data[6]) == 1 else True
+            else:             timing_point.inherited = False
 
-        if data[0] == 'SliderTickRate':
-            beatmap.difficulty.st = float(data[1])
-            return
+            beatmap.timing_points.append(timing_point)
 
 
+    # The leading x, y, time and type columns of all lines are parsed in one go. Circles, the bulk
+    # of most maps, are then made from those columns; only sliders and spinners split their line
+    # for the rest of their data.
     @staticmethod
-    def __parse_events_section(line, beatmap):
-        # ignore
-        return
+    def __parse_hitobjects_section(lines, beatmap):
+        # numpy is only needed once a beatmap is loaded
+        import numpy as np
 
+        lines = [ line for line in lines if ',' in line ]
+        if not lines: return
 
-    @staticmethod
-    def __parse_timingpoints_section(line, beatmap):
-        data = line.split(',')
-        if len(data) < 2: return
+        if beatmap.gamemode != Beatmap.GAMEMODE_OSU:
+            raise Exception('Unsupported Gamemode: ' + str(beatmap.gamemode))
 
-        timing_point = Beatmap.TimingPoint()
-        
-        timing_point.offset        = float(data[0])
-        timing_point.beat_interval = float(data[1])
+        columns = np.loadtxt(lines, delimiter=',', usecols=(0, 1, 2, 3), dtype=np.float64, comments=None, ndmin=2).astype(np.int64)
+        hitobject_types = columns[:, 3]
 
-        # Old maps don't have meteres
-        if len(data) > 2: timing_point.meter = int(data[2])
-        else:             timing_point.meter = 4
+        # Same precedence as the hitobject types are checked in when loading a single line
+        is_circle  = (hitobject_types & Hitobject.CIRCLE) > 0
+        is_slider  = ~is_circle & ((hitobject_types & Hitobject.SLIDER) > 0)
+        is_spinner = ~is_circle & ~is_slider & ((hitobject_types & Hitobject.SPINNER) > 0)
 
-        if len(data) > 6: timing_point.inherited = False if int(data[6]) == 1 else True
-        else:             timing_point.inherited = False
+        # Lines of no known type are left out
+        is_known = is_circle | is_slider | is_spinner
+        if not is_known.all():
+            rows       = np.flatnonzero(is_known)
+            lines      = [ lines[i] for i in rows.tolist() ]
+            columns    = columns[rows]
+            is_circle  = is_circle[rows]
+            is_slider  = is_slider[rows]
+            is_spinner = is_spinner[rows]
 
-        beatmap.timing_points.append(timing_point)
+        difficulty   = beatmap.difficulty
+        slider_rows  = np.flatnonzero(is_slider).tolist()
+        spinner_rows = np.flatnonzero(is_spinner).tolist()
 
+        # Sliders always need their objects, for their curves
+        sliders = [ StdHoldNoteIO.load_holdnote(lines[i].split(','), difficulty) for i in slider_rows ]
 
-    @staticmethod
-    def __parse_colour_section(self, line):
-        # ignore
-        return
+        if beatmap.hitobject_table is None:
+            hitobjects = [ None ]*len(lines)
 
+            circle_rows = np.flatnonzero(is_circle)
+            xs, ys, times, hitobject_types = columns[circle_rows].T.tolist()
+            for i, singlenote in zip(circle_rows.tolist(), StdSingleNoteIO.load_singlenotes(xs, ys, times, hitobject_types, difficulty)):
+                hitobjects[i] = singlenote
 
-    @staticmethod
-    def __parse_hitobjects_section(line, beatmap):
-        data = line.split(',')
-        if len(data) < 2: return
-        
-        hitobject_type = int(data[3])
+            for i, slider in zip(slider_rows, sliders):
+                hitobjects[i] = slider
 
-        if beatmap.gamemode == Beatmap.GAMEMODE_OSU:
-            if Std.is_hitobject_type(hitobject_type, Hitobject.CIRCLE):
-                beatmap.hitobjects.append(StdSingleNoteIO.load_singlenote(data, beatmap.difficulty))
-                return
+            for i in spinner_rows:
+                hitobjects[i] = StdSpinnerIO.load_spinner(lines[i].split(','), difficulty)
 
-            if Std.is_hitobject_type(hitobject_type, Hitobject.SLIDER):
-                beatmap.hitobjects.append(StdHoldNoteIO.load_holdnote(data, beatmap.difficulty))
-                return
+            beatmap.hitobjects += hitobjects
+            return
 
-            if Std.is_hitobject_type(hitobject_type, Hitobject.SPINNER):
-                beatmap.hitobjects.append(StdSpinnerIO.load_spinner(data, beatmap.difficulty))
-                return
+        # With a table, circles and spinners are only rows of it. Slider end times are filled
+        # in once the sliders' timings are processed.
+        table = beatmap.hitobject_table
 
+        table.time         = columns[:, 2].copy()
+        table.end_time     = columns[:, 2].copy()
+        table.x            = columns[:, 0].astype(np.float64)
+        table.y            = columns[:, 1].astype(np.float64)
+        table.type         = columns[:, 3].astype(np.int32)
+        table.repeat       = np.zeros(len(lines), dtype=np.int32)
+        table.pixel_length = np.zeros(len(lines), dtype=np.float64)
+        table.sliders      = sliders
 
-        else:
-            raise Exception('Unsupported Gamemode: ' + str(beatmap.gamemode))
+        table.end_time[is_spinner]    = [ int(lines[i].split(',')[5]) for i in spinner_rows ]
+        table.repeat[is_slider]       = [ slider.repeat for slider in sliders ]
+        table.pixel_length[is_slider] = [ slider.pixel_length for slider in sliders ]
 
 
     @staticmethod
@@ -405,13 +398,22 @@ class BeatmapIO():
             timing_point.slider_multiplier = slider_multiplier
 
     
+    # With a table, sliders are the only hitobjects kept as objects
+    @staticmethod
+    def __get_sliders(beatmap):
+        if beatmap.hitobject_table is not None:
+            return beatmap.hitobject_table.sliders
+
+        return [ hitobject for hitobject in beatmap.hitobjects if hitobject.hitobject_type & Hitobject.SLIDER ]
+
+
     @staticmethod
     def __process_slider_timings(beatmap):
-        for hitobject in beatmap.hitobjects:
-            if not hitobject.is_hitobject_type(Hitobject.SLIDER):
-                continue
+        # Looked up once rather than once per slider
+        offsets = [ timing_point.offset for timing_point in beatmap.timing_points ]
 
-            try: idx_timing_point = find(beatmap.timing_points, hitobject.time, lambda timing_point: timing_point.offset)
+        for hitobject in BeatmapIO.__get_sliders(beatmap):
+            try: idx_timing_point = find(offsets, hitobject.time)
             except:
                 print(beatmap.timing_points)
                 raise
@@ -425,15 +427,9 @@ class BeatmapIO():
     @staticmethod
     def __process_slider_tick_times(beatmap):
         beatmap.slider_tick_times = []
-        for hitobject in beatmap.hitobjects:
-            if not hitobject.is_hitobject_type(Hitobject.SLIDER):
-                continue
-
+        for hitobject in BeatmapIO.__get_sliders(beatmap):
             ms_per_beat = (100.0 * beatmap.difficulty.sm)/(hitobject.get_velocity() * beatmap.difficulty.st)
             hitobject.tick_times = []
 
             for beat_time in range(hitobject.time, hitobject.end_time, int(ms_per_beat)):
                 hitobject.tick_times.append(beat_time)
-            
-
-BeatmapIO.init()
\ No newline at end of file
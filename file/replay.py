@@ -8,6 +8,7 @@ from std.enums import Mod
 from osrparse.replay import ReplayEvent
 from osrparse.enums import GameMode
 from misc.math_utils import find
+from misc.stats import Stats
 
 
 class Replay(osrparse.replay.Replay):
@@ -124,7 +125,8 @@ class Replay(osrparse.replay.Replay):
     # Because library doesn't support non std gamemodes
     def parse_play_data(self, replay_data):
         offset_end = self.offset + self.__replay_length
-        datastring = lzma.decompress(replay_data[self.offset : offset_end], format=lzma.FORMAT_AUTO).decode('ascii')[:-1]
+        with Stats.timer('lzma_decode'):
+            datastring = lzma.decompress(replay_data[self.offset : offset_end], format=lzma.FORMAT_AUTO).decode('ascii')[:-1]
         self.offset = offset_end
 
         events = [ eventstring.split('|') for eventstring in datastring.split(',') ]
@@ -1,5 +1,5 @@
 import os
-from file.replay import Replay
+import struct
 
 
 class ReplayIO():
@@ -12,6 +12,9 @@ class ReplayIO():
     """
     @staticmethod
     def open_replay(filepath=None):
+        # osrparse is only loaded once a replay actually needs to be decoded
+        from file.replay import Replay
+
         with open(filepath, 'rb') as replay_data:
             replay = Replay(replay_data.read())
 
@@ -26,9 +29,47 @@ class ReplayIO():
     """
     @staticmethod
     def load_replay(replay_data):
+        from file.replay import Replay
         return Replay(replay_data)
 
 
+    """
+    Reads only the md5 of the beatmap the replay was played on, without decoding the
+    rest of the replay
+
+    Args:
+        replay_data: (bytes) contents of the replay file, or at least its beginning
+
+    Returns:
+        md5 of the beatmap as a string
+    """
+    @staticmethod
+    def load_beatmap_hash(replay_data):
+        offset = struct.calcsize('<bi')  # game mode, game version
+        beatmap_hash, offset = ReplayIO.__read_string(replay_data, offset)
+
+        return beatmap_hash
+
+
+    """
+    Reads only the md5 of the replay, without decoding the rest of the replay
+
+    Args:
+        replay_data: (bytes) contents of the replay file, or at least its beginning
+
+    Returns:
+        md5 of the replay as a string
+    """
+    @staticmethod
+    def load_replay_hash(replay_data):
+        offset = struct.calcsize('<bi')  # game mode, game version
+        beatmap_hash, offset = ReplayIO.__read_string(replay_data, offset)
+        player_name, offset  = ReplayIO.__read_string(replay_data, offset)
+        replay_hash, offset  = ReplayIO.__read_string(replay_data, offset)
+
+        return replay_hash
+
+
     """
     Saves replay data to file
 
@@ -43,4 +84,24 @@ class ReplayIO():
             os.makedirs(path)
             
         with open(filepath, 'wb') as f:
-            f.write(replay_data)
\ No newline at end of file
+            f.write(replay_data)
+
+
+    # Reads an osu! string at the offset. Returns the string, or None if it's empty, and the offset after it
+    @staticmethod
+    def __read_string(replay_data, offset):
+        if replay_data[offset] == 0x00: return None, offset + 1
+        if replay_data[offset] != 0x0b: raise Exception('Invalid replay')
+        offset += 1
+
+        # String length is a ULEB128 number
+        length = 0
+        shift  = 0
+        while True:
+            byte = replay_data[offset]
+            offset += 1
+            length |= (byte & 0x7F) << shift
+            if byte < 128: break
+            shift += 7
+
+        return replay_data[offset : offset + length].decode('utf-8'), offset + length
\ No newline at end of file
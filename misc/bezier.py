@@ -1,11 +1,18 @@
+import math
+
 from misc.math_utils import bernstein
 from misc.pos import Pos
 
 
 class Bezier():
 
+    # (degree, number of samples) -> Bernstein basis matrix. Sliders mostly share a few degrees
+    # and lengths, so the same matrices come up over and over within and across beatmaps.
+    basis_cache     = {}
+    basis_cache_max = 1024
+
     def __init__(self, curve_points):
-        self.curve_points    = []
+        self.curve_points    = None  # (N, 2) numpy array
         self.curve_distances = [ 0 ]
         self.total_distance  = 0
 
@@ -16,8 +23,7 @@ class Bezier():
 
         # subdivide the curve
         ncurve = int(approx_length / 4.0) + 2
-        for i in range(ncurve):
-            self.curve_points.append(Bezier.point_at(curve_points, float(i) / float(ncurve - 1)))
+        self.curve_points = Bezier.points_at(curve_points, ncurve)
 
         # find the distance of each point from the previous point
         for i in range(1, len(curve_points)):
@@ -25,7 +31,7 @@ class Bezier():
             self.total_distance += self.curve_distances[i]
 
 
-    # Returns the points along the curve of the Bezier curve.
+    # Returns the points along the curve of the Bezier curve, as an (N, 2) numpy array.
     def get_curve_points(self):
         return self.curve_points
 
@@ -38,8 +44,62 @@ class Bezier():
     #  Returns the total distances of this Bezier curve.
     def get_total_curve_distance(self):
         return self.total_distance
-    
 
+
+    """
+    Evaluates the curve at evenly spaced t from 0 to 1, all at once
+
+    Args:
+        curve_points: (list) Pos of the control points
+        num_samples: (int) number of points to evaluate; at least 2
+
+    Returns:
+        numpy array of shape (num_samples, 2) with the points on the curve
+    """
+    @staticmethod
+    def points_at(curve_points, num_samples):
+        # numpy is only needed once a slider's curve is generated
+        import numpy as np
+
+        control_points = np.asarray([ (point.x, point.y) for point in curve_points ], dtype=np.float64)
+        basis = Bezier.get_basis(len(curve_points) - 1, num_samples)
+
+        return basis @ control_points
+
+
+    """
+    Args:
+        degree: (int) degree of the curve; the number of control points - 1
+        num_samples: (int) number of evenly spaced t from 0 to 1; at least 2
+
+    Returns:
+        numpy array of shape (num_samples, degree + 1) where row i holds the Bernstein
+        polynomials of the degree at t = i/(num_samples - 1)
+    """
+    @staticmethod
+    def get_basis(degree, num_samples):
+        key   = (degree, num_samples)
+        basis = Bezier.basis_cache.get(key)
+        if basis is not None:
+            return basis
+
+        import numpy as np
+
+        t = (np.arange(num_samples, dtype=np.float64) / (num_samples - 1))[:, np.newaxis]
+        k = np.arange(degree + 1)
+
+        coefficients = np.asarray([ math.comb(degree, i) for i in range(degree + 1) ], dtype=np.float64)
+        basis = coefficients * (t**k) * ((1.0 - t)**(degree - k))
+        basis.setflags(write=False)
+
+        if len(Bezier.basis_cache) >= Bezier.basis_cache_max:
+            Bezier.basis_cache.clear()
+
+        Bezier.basis_cache[key] = basis
+        return basis
+
+
+    # Evaluates the curve at a single t. Slower than points_at, which evaluates many at once.
     @staticmethod
     def point_at(curve_points, t):
         c = Pos(0, 0)
@@ -49,4 +109,4 @@ class Bezier():
             b = bernstein(i, n - 1, t)
             c += Pos(curve_points[i].x * b, curve_points[i].y * b)
 
-        return c
\ No newline at end of file
+        return c
@@ -0,0 +1,135 @@
+import collections
+import contextlib
+import threading
+import math
+import time
+
+
+'''
+Description: Keeps rolling timing and counter statistics in memory
+
+Timings are kept per stage for the last Stats.window samples. Counters are totals
+since the process started. Counters named "<name>_hit" and "<name>_miss" are
+reported as a hit rate of <name>.
+
+Input:
+    timer - time a block of code as a stage
+    record_time - record a duration for a stage
+    increment - add to a counter
+
+Output:
+    get_report - text summary of all stages and counters
+'''
+class Stats():
+
+    window = 256  # Number of most recent samples per stage percentiles are calculated from
+
+    lock     = threading.Lock()
+    timings  = collections.OrderedDict()  # stage -> deque of durations in seconds
+    counters = collections.OrderedDict()  # name -> total
+
+    """
+    Times the wrapped block of code and records it under the stage
+
+    Args:
+        stage: (string) name of the stage
+    """
+    @staticmethod
+    @contextlib.contextmanager
+    def timer(stage):
+        start = time.perf_counter()
+        try: yield
+        finally:
+            Stats.record_time(stage, time.perf_counter() - start)
+
+
+    """
+    Args:
+        stage: (string) name of the stage
+        seconds: (float) how long the stage took
+    """
+    @staticmethod
+    def record_time(stage, seconds):
+        with Stats.lock:
+            if not stage in Stats.timings:
+                Stats.timings[stage] = collections.deque(maxlen=Stats.window)
+            Stats.timings[stage].append(seconds)
+
+
+    """
+    Args:
+        name: (string) name of the counter
+        amount: (int) how much to add
+    """
+    @staticmethod
+    def increment(name, amount=1):
+        if amount == 0:
+            return
+
+        with Stats.lock:
+            Stats.counters[name] = Stats.counters.get(name, 0) + amount
+
+
+    """
+    Args:
+        stage: (string) name of the stage
+        percentiles: (list) which percentiles to calculate
+
+    Returns:
+        List of durations in seconds at each of the percentiles, or None if the stage was never recorded
+    """
+    @staticmethod
+    def get_percentiles(stage, percentiles=(50, 90, 99)):
+        with Stats.lock:
+            if not stage in Stats.timings: return None
+            samples = sorted(Stats.timings[stage])
+
+        # Nearest-rank percentiles
+        return [ samples[max(0, math.ceil(percentile/100.0*len(samples)) - 1)] for percentile in percentiles ]
+
+
+    """
+    Args:
+        name: (string) name of the counter
+
+    Returns:
+        Total of the counter, 0 if it was never incremented
+    """
+    @staticmethod
+    def get_count(name):
+        with Stats.lock:
+            return Stats.counters.get(name, 0)
+
+
+    """
+    Returns:
+        List of lines describing all stages and counters
+    """
+    @staticmethod
+    def get_report():
+        with Stats.lock:
+            stages   = [ (stage, len(samples)) for stage, samples in Stats.timings.items() ]
+            counters = dict(Stats.counters)
+
+        lines = []
+        for stage, num_samples in stages:
+            p50, p90, p99 = Stats.get_percentiles(stage)
+            lines.append('%-20s n=%-4d p50 %8.3f s  p90 %8.3f s  p99 %8.3f s' % (stage, num_samples, p50, p90, p99))
+
+        for name, count in counters.items():
+            if name.endswith('_hit') or name.endswith('_miss'):
+                continue
+            lines.append('%-20s %d' % (name, count))
+
+        hit_rate_names = [ name[:-len('_hit')] for name in counters if name.endswith('_hit') ]
+        hit_rate_names += [ name[:-len('_miss')] for name in counters if name.endswith('_miss') and not name[:-len('_miss')] in hit_rate_names ]
+
+        for name in hit_rate_names:
+            hits   = counters.get(name + '_hit', 0)
+            misses = counters.get(name + '_miss', 0)
+            if hits + misses == 0:
+                continue
+
+            lines.append('%-20s %.1f%% hit rate (%d/%d)' % (name, 100.0*hits/(hits + misses), hits, hits + misses))
+
+        return lines
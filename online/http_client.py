@@ -0,0 +1,66 @@
+import time
+import requests
+
+from requests.adapters import HTTPAdapter
+from misc.stats import Stats
+
+
+'''
+Description: HTTP session with a pool of keep-alive connections
+
+Connections to a host are kept open and reused between requests, so back to back
+requests don't pay for a new TCP and TLS handshake each time. Responses are
+requested gzip compressed. Every request is timed and counted in Stats, along with
+the bytes received over the connection (bytes_downloaded) and the bytes they
+decoded to (bytes_decoded), so the ratio of the two is what compression saves.
+
+Input:
+    pool_size - number of connections kept open per host
+    timeout - seconds to wait for the server before giving up on a request
+'''
+class HttpClient(requests.Session):
+
+    def __init__(self, pool_size=4, timeout=60):
+        requests.Session.__init__(self)
+
+        self.timeout = timeout
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+        self.headers.update({ 'Accept-Encoding' : 'gzip, deflate' })
+
+
+    def request(self, method, url, **kwargs):
+        if not 'timeout' in kwargs:
+            kwargs['timeout'] = self.timeout
+
+        start    = time.perf_counter()
+        response = requests.Session.request(self, method, url, **kwargs)
+        Stats.record_time('http_request', time.perf_counter() - start)
+
+        Stats.increment('http_requests')
+        Stats.increment('bytes_downloaded', HttpClient.get_download_size(response.headers, response.content, response.raw.tell()))
+        Stats.increment('bytes_decoded', len(response.content))
+
+        return response
+
+
+    """
+    Args:
+        headers: headers of the response
+        body: (bytes) body of the response after decompression
+        num_read: (int) bytes read off the connection for the body, 0 if not known
+
+    Returns:
+        Number of bytes the body took over the connection. Falls back to Content-Length,
+        then to the decompressed size for chunked responses nothing else is known of.
+    """
+    @staticmethod
+    def get_download_size(headers, body, num_read=0):
+        if num_read > 0:
+            return num_read
+
+        try: return int(headers['Content-Length'])
+        except (KeyError, ValueError): return len(body)
@@ -1,75 +1,302 @@
-import urllib.request
 import json
 import io
 
 from file.beatmap import Beatmap
-from online.session_manager import SessionMgr
-from online.rate_limited import rate_limited
+from cache.beatmap_cache import BeatmapCache
+from cache.leaderboard_cache import LeaderboardCache
+from cache.replay_cache import ReplayCache
+from online.rate_limited import RateLimiter, TooManyRequests, rate_limited
 from online.login import username, password
+from misc.stats import Stats
 
 
 class OsuOnline():
 
+    # Point at a local stand-in server to test without osu.ppy.sh, see benchmarks/osu_server.py
+    base_url = 'https://osu.ppy.sh'
+
     session_manager = None
 
+    # One budget shared by every request made to osu.ppy.sh. Score and replay requests take a
+    # token each, beatmap downloads are cheaper. Starts at one token every 3 seconds.
+    rate_limiter = RateLimiter(rate=1/3, burst=2, max_rate=1/2)
+
+    """
+    Beatmaps are kept in the beatmap cache. A cached beatmap is returned without any
+    request if it matches the expected md5, or if no md5 is given and it was validated
+    recently. Otherwise it is revalidated with a conditional request.
+
+    Args:
+        beatmap_id: (int) id of the beatmap
+        strio: (bool) return a file-like object instead of a string
+        beatmap_md5: (string) md5 the beatmap is expected to have, e.g. the checksum in score data
+
+    Returns:
+        Contents of the .osu file
+    """
     @staticmethod
-    @rate_limited(rate_limit=0.5)
-    def fetch_beatmap_file(beatmap_id, strio=False):
-        url      = 'https://osu.ppy.sh/osu/' + str(beatmap_id)
-        response = urllib.request.urlopen(url)
-        data     = response.read()
-        
+    def fetch_beatmap_file(beatmap_id, strio=False, beatmap_md5=None):
+        data, stale_entry = OsuOnline.get_cached_beatmap(beatmap_id, beatmap_md5)
+
+        if data == None:
+            etag, last_modified = OsuOnline.get_beatmap_validators(stale_entry)
+            download = OsuOnline.__download_beatmap_file(beatmap_id, etag, last_modified)
+            data     = OsuOnline.store_beatmap(beatmap_id, download, stale_entry)
+
         if not strio: return data.decode('utf-8')
         else:         return io.StringIO(data.decode('utf-8'))
 
+
+    """
+    First half of fetch_beatmap_file, shared with OsuOnlineAsync. Reads the disk cache.
+
+    Args:
+        beatmap_id: (int) id of the beatmap
+        beatmap_md5: (string) md5 the beatmap is expected to have, if known
+
+    Returns:
+        (data, stale_entry). data is the cached beatmap if it can be used as is, otherwise
+        None and the beatmap needs downloading. stale_entry is the cached (data, meta) to
+        revalidate with the download, or None to download it outright.
+    """
+    @staticmethod
+    def get_cached_beatmap(beatmap_id, beatmap_md5=None):
+        entry = BeatmapCache.get_beatmap(beatmap_id)
+
+        if entry != None and BeatmapCache.is_fresh(entry[1], beatmap_md5):
+            Stats.increment('beatmap_cache_hit')
+            return entry[0], None
+
+        Stats.increment('beatmap_cache_miss')
+
+        # A cached beatmap with the wrong md5 is outdated; there is nothing to revalidate
+        if entry != None and beatmap_md5 == None:
+            return None, entry
+
+        return None, None
+
+
+    """
+    Args:
+        stale_entry: (tuple) cached (data, meta) as returned by get_cached_beatmap, or None
+
+    Returns:
+        (etag, last_modified) to make the beatmap download conditional with
+    """
+    @staticmethod
+    def get_beatmap_validators(stale_entry):
+        if stale_entry == None: return None, None
+        return stale_entry[1]['etag'], stale_entry[1]['last_modified']
+
+
+    """
+    Second half of fetch_beatmap_file, shared with OsuOnlineAsync. Writes the disk cache.
+
+    Args:
+        beatmap_id: (int) id of the beatmap
+        download: (tuple) (data, etag, last_modified) of the download, or None if the server said the stale entry is current
+        stale_entry: (tuple) cached (data, meta) as returned by get_cached_beatmap
+
+    Returns:
+        Contents of the .osu file as bytes
+    """
+    @staticmethod
+    def store_beatmap(beatmap_id, download, stale_entry):
+        if download == None:
+            Stats.increment('beatmap_not_modified')
+            BeatmapCache.touch_beatmap(beatmap_id)
+            return stale_entry[0]
+
+        data, etag, last_modified = download
+        BeatmapCache.put_beatmap(beatmap_id, data, etag, last_modified)
+
+        return data
+
+
+    # Returns (data, etag, last_modified), or None if the server says the beatmap did not change since it was served with the given headers
+    @staticmethod
+    @rate_limited(rate_limiter, cost=1/6)
+    def __download_beatmap_file(beatmap_id, etag=None, last_modified=None):
+        url = OsuOnline.base_url + '/osu/' + str(beatmap_id)
+
+        headers = {}
+        if etag          != None: headers['If-None-Match']     = etag
+        if last_modified != None: headers['If-Modified-Since'] = last_modified
+
+        with Stats.timer('http_beatmap'):
+            response = OsuOnline.get_session_manager().get(url, headers=headers)
+
+        if response.status_code == 429:
+            raise TooManyRequests(OsuOnline.get_retry_after(response.headers))
+
+        if response.status_code == 304:
+            return None
+
+        response.raise_for_status()
+
+        return response.content, response.headers.get('ETag'), response.headers.get('Last-Modified')
+
     
+    """
+    Leaderboards are kept in the leaderboard cache for a short while, so requests for the
+    same beatmap shortly after each other don't wait on the rate limit.
+
+    Args:
+        beatmap_id: (int) id of the beatmap
+        gamemode: (int or string) gamemode of the leaderboard
+        leaderboard_type: (string) type of the leaderboard, e.g. global or country
+
+    Returns:
+        List of score data, or None if the leaderboard could not be fetched
+    """
+    @staticmethod
+    def fetch_scores(beatmap_id, gamemode, leaderboard_type='global'):
+        gamemode = OsuOnline.get_gamemode_name(gamemode)
+        key      = (int(beatmap_id), gamemode, leaderboard_type)
+
+        return LeaderboardCache.get_scores(key, lambda: OsuOnline.__download_scores(beatmap_id, gamemode, leaderboard_type))
+
+
     @staticmethod
-    @rate_limited(rate_limit=3)
-    def fetch_scores(beatmap_id, gamemode):
-        if type(gamemode) == int:
-            if   gamemode == Beatmap.GAMEMODE_OSU:   gamemode = 'osu'
-            elif gamemode == Beatmap.GAMEMODE_TAIKO: gamemode = 'taiko'
-            elif gamemode == Beatmap.GAMEMODE_CATCH: gamemode = 'fruits'
-            elif gamemode == Beatmap.GAMEMODE_MANIA: gamemode = 'mania'
-            else: raise Exception('Unknown gamemode: ' + str(gamemode))
-        
-        url = 'https://osu.ppy.sh/beatmaps/' + str(beatmap_id) + '/scores?type=global&mode=' + str(gamemode)
-        try: response = urllib.request.urlopen(url)
-        except urllib.error.HTTPError as e:
-            print('Error opening ' + url + '\n' + str(e))
+    @rate_limited(rate_limiter, cost=1)
+    def __download_scores(beatmap_id, gamemode, leaderboard_type):
+        url = OsuOnline.base_url + '/beatmaps/' + str(beatmap_id) + '/scores?type=' + str(leaderboard_type) + '&mode=' + str(gamemode)
+        with Stats.timer('http_scores'):
+            response = OsuOnline.get_session_manager().get(url)
+
+        if response.status_code == 429:
+            raise TooManyRequests(OsuOnline.get_retry_after(response.headers))
+
+        if response.status_code != 200:
+            print('Error opening ' + url + '\n' + 'Status code: ' + str(response.status_code))
             return
 
-        data = json.loads(response.read())
+        data = json.loads(response.content)
         return data['scores']
 
 
+    """
+    Replays that were downloaded before are read from the replay cache and don't count
+    against the rate limit.
+
+    Args:
+        gamemode: (int or string) gamemode the score was set in
+        replay_id: (int) id of the score
+
+    Returns:
+        Contents of the .osr file as bytes
+    """
     @staticmethod
-    @rate_limited(rate_limit=3)
     def fetch_replay_file(gamemode, replay_id):
-        if not OsuOnline.session_manager:
-            OsuOnline.session_manager = SessionMgr()
-            OsuOnline.session_manager.login(username, password)
+        replay_data = OsuOnline.get_cached_replay(replay_id)
+        if replay_data != None:
+            return replay_data
 
-        xsrf_token = OsuOnline.session_manager.get_xsrf_token()
-        if xsrf_token == None: raise Exception('xsrf_token is None')
+        replay_data = OsuOnline.__download_replay_file(gamemode, replay_id)
+        ReplayCache.put_replay(replay_id, replay_data)
 
-        osu_session = OsuOnline.session_manager.get_osu_session()
-        if osu_session == None: raise Exception('osu_session is None')
+        return replay_data
 
-        if type(gamemode) == int:
-            if   gamemode == Beatmap.GAMEMODE_OSU:   gamemode = 'osu'
-            elif gamemode == Beatmap.GAMEMODE_TAIKO: gamemode = 'taiko'
-            elif gamemode == Beatmap.GAMEMODE_CATCH: gamemode = 'fruits'
-            elif gamemode == Beatmap.GAMEMODE_MANIA: gamemode = 'mania'
-            else: raise Exception('Unknown gamemode: ' + str(gamemode))
 
-        url = 'https://osu.ppy.sh/scores/' + str(gamemode) + '/' + str(replay_id) + '/download'
-        headers = {
-            'X-CSRF-TOKEN': xsrf_token,
-            'osu_session' : osu_session
-        }
+    """
+    Cache lookup of fetch_replay_file, shared with OsuOnlineAsync. Reads the disk cache.
 
+    Args:
+        replay_id: (int) id of the score
+
+    Returns:
+        Contents of the .osr file as bytes, or None if the replay needs downloading
+    """
+    @staticmethod
+    def get_cached_replay(replay_id):
+        replay_data = ReplayCache.get_replay(replay_id)
+
+        if replay_data != None: Stats.increment('replay_cache_hit')
+        else:                   Stats.increment('replay_cache_miss')
+
+        return replay_data
+
+
+    @staticmethod
+    @rate_limited(rate_limiter, cost=1)
+    def __download_replay_file(gamemode, replay_id):
+        session_manager = OsuOnline.get_session_manager()
+        gamemode = OsuOnline.get_gamemode_name(gamemode)
+
+        url = OsuOnline.base_url + '/scores/' + str(gamemode) + '/' + str(replay_id) + '/download'
         print(url)
 
-        response = OsuOnline.session_manager.get(url, headers=headers)
-        return response.content
\ No newline at end of file
+        for attempt in range(2):
+            session_manager.login(username, password)
+
+            xsrf_token = session_manager.get_xsrf_token()
+            if xsrf_token == None: raise Exception('xsrf_token is None')
+
+            osu_session = session_manager.get_osu_session()
+            if osu_session == None: raise Exception('osu_session is None')
+
+            headers = {
+                'X-CSRF-TOKEN': xsrf_token,
+                'osu_session' : osu_session
+            }
+
+            with Stats.timer('http_replay'):
+                response = session_manager.get(url, headers=headers)
+
+            # The saved session expired; log in again once
+            if response.status_code in [ 401, 403 ] and attempt == 0:
+                Stats.increment('session_expired')
+                session_manager.logout()
+                continue
+
+            break
+
+        if response.status_code == 429:
+            raise TooManyRequests(OsuOnline.get_retry_after(response.headers))
+
+        # Don't let an error page end up in the replay cache
+        response.raise_for_status()
+
+        return response.content
+
+
+    """
+    Returns:
+        Name of the gamemode as used in osu! website urls
+    """
+    @staticmethod
+    def get_gamemode_name(gamemode):
+        if type(gamemode) != int: return gamemode
+
+        if   gamemode == Beatmap.GAMEMODE_OSU:   return 'osu'
+        elif gamemode == Beatmap.GAMEMODE_TAIKO: return 'taiko'
+        elif gamemode == Beatmap.GAMEMODE_CATCH: return 'fruits'
+        elif gamemode == Beatmap.GAMEMODE_MANIA: return 'mania'
+        else: raise Exception('Unknown gamemode: ' + str(gamemode))
+
+
+    """
+    All requests go through the same session, so connections are reused between them.
+    The session logs in only when a request needs it.
+
+    Returns:
+        The session manager
+    """
+    @staticmethod
+    def get_session_manager():
+        if not OsuOnline.session_manager:
+            # requests is only loaded once the first request is made
+            from online.session_manager import SessionMgr
+            OsuOnline.session_manager = SessionMgr(OsuOnline.base_url)
+
+        return OsuOnline.session_manager
+
+
+    """
+    Returns:
+        Seconds the Retry-After header of a response asks to wait for, or None if there is none
+    """
+    @staticmethod
+    def get_retry_after(headers):
+        try: return float(headers.get('Retry-After'))
+        except (TypeError, ValueError): return None
\ No newline at end of file
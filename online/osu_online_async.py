@@ -0,0 +1,247 @@
+import asyncio
+import io
+import json
+import time
+
+from cache.leaderboard_cache import LeaderboardCache
+from cache.replay_cache import ReplayCache
+from online.osu_online import OsuOnline
+from online.rate_limited import TooManyRequests, rate_limited_async
+from online.login import username, password
+from misc.stats import Stats
+
+
+'''
+Description: asyncio counterpart of OsuOnline
+
+Fetches beatmaps, leaderboards and replays without blocking the event loop, so many
+fetches can be in flight at once. Everything is shared with OsuOnline: requests take
+tokens from the same rate limiter, go to the same base_url and are served from and
+stored in the same caches. Cancelling a fetch while it waits for tokens gives the
+tokens back; cancelling it during the request aborts the request.
+
+Logging in is left to OsuOnline's session manager, which keeps the login saved
+between restarts. It runs in a worker thread the first time a replay is fetched.
+The caches are on disk and shared with the job threads, so they are read and written
+from worker threads too, never on the event loop.
+
+Input:
+    fetch_beatmap_file, fetch_scores, fetch_replay_file - same as in OsuOnline
+
+Output:
+    Same as the OsuOnline functions, awaited
+'''
+class OsuOnlineAsync():
+
+    pool_size = 4   # connections kept open
+    timeout   = 60  # seconds
+
+    session      = None
+    session_loop = None
+
+    """
+    Args:
+        beatmap_id: (int) id of the beatmap
+        strio: (bool) return a file-like object instead of a string
+        beatmap_md5: (string) md5 the beatmap is expected to have, e.g. the checksum in score data
+
+    Returns:
+        Contents of the .osu file
+    """
+    @staticmethod
+    async def fetch_beatmap_file(beatmap_id, strio=False, beatmap_md5=None):
+        loop = asyncio.get_running_loop()
+
+        # The disk cache reads, hashes and writes files; keep that off the event loop
+        data, stale_entry = await loop.run_in_executor(None, OsuOnline.get_cached_beatmap, beatmap_id, beatmap_md5)
+
+        if data == None:
+            etag, last_modified = OsuOnline.get_beatmap_validators(stale_entry)
+            download = await OsuOnlineAsync.__download_beatmap_file(beatmap_id, etag, last_modified)
+            data     = await loop.run_in_executor(None, OsuOnline.store_beatmap, beatmap_id, download, stale_entry)
+
+        if not strio: return data.decode('utf-8')
+        else:         return io.StringIO(data.decode('utf-8'))
+
+
+    # Returns (data, etag, last_modified), or None if the server says the beatmap did not change
+    @staticmethod
+    @rate_limited_async(OsuOnline.rate_limiter, cost=1/6)
+    async def __download_beatmap_file(beatmap_id, etag=None, last_modified=None):
+        url = OsuOnline.base_url + '/osu/' + str(beatmap_id)
+
+        headers = {}
+        if etag          != None: headers['If-None-Match']     = etag
+        if last_modified != None: headers['If-Modified-Since'] = last_modified
+
+        with Stats.timer('http_beatmap'):
+            status, response_headers, data = await OsuOnlineAsync.__request('GET', url, headers=headers)
+
+        if status == 429:
+            raise TooManyRequests(OsuOnline.get_retry_after(response_headers))
+
+        if status == 304:
+            return None
+
+        if status != 200:
+            raise Exception('Error opening ' + url + '; Status code: ' + str(status))
+
+        return data, response_headers.get('ETag'), response_headers.get('Last-Modified')
+
+
+    """
+    Args:
+        beatmap_id: (int) id of the beatmap
+        gamemode: (int or string) gamemode of the leaderboard
+        leaderboard_type: (string) type of the leaderboard, e.g. global or country
+
+    Returns:
+        List of score data, or None if the leaderboard could not be fetched
+    """
+    @staticmethod
+    async def fetch_scores(beatmap_id, gamemode, leaderboard_type='global'):
+        gamemode = OsuOnline.get_gamemode_name(gamemode)
+        key      = (int(beatmap_id), gamemode, leaderboard_type)
+
+        return await LeaderboardCache.get_scores_async(key, lambda: OsuOnlineAsync.__download_scores(beatmap_id, gamemode, leaderboard_type))
+
+
+    @staticmethod
+    @rate_limited_async(OsuOnline.rate_limiter, cost=1)
+    async def __download_scores(beatmap_id, gamemode, leaderboard_type):
+        url = OsuOnline.base_url + '/beatmaps/' + str(beatmap_id) + '/scores?type=' + str(leaderboard_type) + '&mode=' + str(gamemode)
+        with Stats.timer('http_scores'):
+            status, response_headers, data = await OsuOnlineAsync.__request('GET', url)
+
+        if status == 429:
+            raise TooManyRequests(OsuOnline.get_retry_after(response_headers))
+
+        if status != 200:
+            print('Error opening ' + url + '\n' + 'Status code: ' + str(status))
+            return
+
+        return json.loads(data)['scores']
+
+
+    """
+    Args:
+        gamemode: (int or string) gamemode the score was set in
+        replay_id: (int) id of the score
+
+    Returns:
+        Contents of the .osr file as bytes
+    """
+    @staticmethod
+    async def fetch_replay_file(gamemode, replay_id):
+        loop = asyncio.get_running_loop()
+
+        replay_data = await loop.run_in_executor(None, OsuOnline.get_cached_replay, replay_id)
+        if replay_data != None:
+            return replay_data
+
+        replay_data = await OsuOnlineAsync.__download_replay_file(gamemode, replay_id)
+        await loop.run_in_executor(None, ReplayCache.put_replay, replay_id, replay_data)
+
+        return replay_data
+
+
+    @staticmethod
+    @rate_limited_async(OsuOnline.rate_limiter, cost=1)
+    async def __download_replay_file(gamemode, replay_id):
+        loop = asyncio.get_running_loop()
+        session_manager = OsuOnline.get_session_manager()
+        gamemode = OsuOnline.get_gamemode_name(gamemode)
+
+        url = OsuOnline.base_url + '/scores/' + str(gamemode) + '/' + str(replay_id) + '/download'
+
+        for attempt in range(2):
+            if not session_manager.is_logged_in():
+                await loop.run_in_executor(None, session_manager.login, username, password)
+
+            xsrf_token = session_manager.get_xsrf_token()
+            if xsrf_token == None: raise Exception('xsrf_token is None')
+
+            osu_session = session_manager.get_osu_session()
+            if osu_session == None: raise Exception('osu_session is None')
+
+            headers = {
+                'X-CSRF-TOKEN': xsrf_token,
+                'osu_session' : osu_session,
+                'Cookie'      : 'osu_session=' + osu_session + '; XSRF-TOKEN=' + xsrf_token,
+            }
+
+            with Stats.timer('http_replay'):
+                status, response_headers, data = await OsuOnlineAsync.__request('GET', url, headers=headers)
+
+            # The saved session expired; log in again once
+            if status in [ 401, 403 ] and attempt == 0:
+                Stats.increment('session_expired')
+                await loop.run_in_executor(None, session_manager.logout)
+                continue
+
+            break
+
+        if status == 429:
+            raise TooManyRequests(OsuOnline.get_retry_after(response_headers))
+
+        # Don't let an error page end up in the replay cache
+        if status != 200:
+            raise Exception('Error opening ' + url + '; Status code: ' + str(status))
+
+        return data
+
+
+    """
+    Closes the connections of the session. A new session is opened by the next fetch.
+    """
+    @staticmethod
+    async def close():
+        if OsuOnlineAsync.session == None: return
+
+        await OsuOnlineAsync.session.close()
+        OsuOnlineAsync.session      = None
+        OsuOnlineAsync.session_loop = None
+
+
+    """
+    All fetches on an event loop go through the same session, so connections are reused
+    between them.
+
+    Returns:
+        The aiohttp session of the running event loop
+    """
+    @staticmethod
+    def get_session():
+        loop = asyncio.get_running_loop()
+
+        if OsuOnlineAsync.session == None or OsuOnlineAsync.session_loop != loop:
+            # aiohttp is only loaded once the first request is made
+            import aiohttp
+
+            OsuOnlineAsync.session = aiohttp.ClientSession(
+                connector = aiohttp.TCPConnector(limit=OsuOnlineAsync.pool_size),
+                timeout   = aiohttp.ClientTimeout(total=OsuOnlineAsync.timeout),
+                headers   = { 'Accept-Encoding' : 'gzip, deflate' },
+            )
+            OsuOnlineAsync.session_loop = loop
+
+        return OsuOnlineAsync.session
+
+
+    # Returns (status, headers, body)
+    @staticmethod
+    async def __request(method, url, **kwargs):
+        start = time.perf_counter()
+
+        async with OsuOnlineAsync.get_session().request(method, url, **kwargs) as response:
+            data = await response.read()
+
+        # Loaded along with aiohttp rather than at startup; it brings requests along
+        from online.http_client import HttpClient
+
+        Stats.record_time('http_request', time.perf_counter() - start)
+        Stats.increment('http_requests')
+        Stats.increment('bytes_downloaded', HttpClient.get_download_size(response.headers, data))
+        Stats.increment('bytes_decoded', len(data))
+
+        return response.status, response.headers, data
@@ -1,23 +1,245 @@
+import asyncio
+import threading
 import time
 
+from misc.stats import Stats
 
-def rate_limited(rate_limit=0, throw_exception=False):
+
+class TooManyRequests(Exception):
+
+    def __init__(self, retry_after=None):
+        Exception.__init__(self, 'Too many requests')
+        self.retry_after = retry_after
+
+
+
+'''
+Description: Token bucket rate limiter that can be shared by several functions
+
+Tokens refill at a steady rate up to the burst size. Every request takes its cost in
+tokens. When there are not enough tokens, the request reserves them anyway and waits
+until the bucket has refilled past the debt, so waiting requests are served in order.
+
+The refill rate adapts: every throttled response halves it down to min_rate, and
+every successful response raises it up towards max_rate, which may be set above the
+starting rate to probe for more throughput.
+
+Safe to use from several threads and from asyncio coroutines at the same time.
+
+Input:
+    rate - tokens refilled per second
+    burst - maximum number of tokens the bucket holds
+    min_rate - lowest rate throttling can bring the rate down to; defaults to rate/8
+    max_rate - highest rate successful requests can bring the rate up to; defaults to rate
+
+Output:
+    acquire/acquire_async - wait until the request may be made
+'''
+class RateLimiter():
+
+    RECOVERY = 0.1  # Fraction of max_rate regained per successful request
+
+    def __init__(self, rate, burst=1, min_rate=None, max_rate=None):
+        self.max_rate = max_rate if max_rate != None else rate
+        self.min_rate = min_rate if min_rate != None else rate/8
+        self.rate     = rate
+        self.burst    = burst
+
+        self.lock        = threading.Lock()
+        self.tokens      = burst
+        self.last_refill = time.monotonic()
+
+        # Number of acquires currently waiting for tokens
+        self.num_waiting = 0
+
+        # Total tokens ever reserved. A waiter may go once the tokens refilled since it reserved
+        # make up for everything reserved up to and including its own reservation.
+        self.num_reserved = 0
+
+
+    """
+    Blocks until the request may be made
+
+    Args:
+        cost: (float) tokens the request takes
+        throw_exception: (bool) raise an exception instead of blocking if the request would need to wait
+    """
+    def acquire(self, cost=1, throw_exception=False):
+        wait_time, ticket = self.__reserve(cost, throw_exception)
+        if wait_time <= 0: return
+
+        total_wait_time = 0
+
+        with self.lock: self.num_waiting += 1
+        try:
+            while wait_time > 0:
+                time.sleep(wait_time)
+                total_wait_time += wait_time
+                wait_time = self.__get_wait_time(ticket)
+        finally:
+            with self.lock: self.num_waiting -= 1
+
+        Stats.record_time('rate_limit_wait', total_wait_time)
+
+
+    """
+    Waits on the event loop until the request may be made. If the wait is cancelled,
+    the reserved tokens are given back.
+
+    Args:
+        cost: (float) tokens the request takes
+    """
+    async def acquire_async(self, cost=1):
+        wait_time, ticket = self.__reserve(cost)
+        if wait_time <= 0: return
+
+        total_wait_time = 0
+
+        with self.lock: self.num_waiting += 1
+        try:
+            while wait_time > 0:
+                await asyncio.sleep(wait_time)
+                total_wait_time += wait_time
+                wait_time = self.__get_wait_time(ticket)
+        except asyncio.CancelledError:
+            with self.lock: self.tokens += cost
+            raise
+        finally:
+            with self.lock: self.num_waiting -= 1
+
+        Stats.record_time('rate_limit_wait', total_wait_time)
+
+
+    """
+    Call when the server responded with too many requests. Slows down the rate and
+    holds off further requests, including ones already waiting for tokens.
+
+    Args:
+        retry_after: (float) seconds the server asked to wait, if it did
+    """
+    def throttled(self, retry_after=None):
+        with self.lock:
+            self.__refill()
+            self.rate = max(self.min_rate, self.rate/2)
+
+            # Hold off everyone for the time the server asked for, or at least one request's worth
+            hold_time   = retry_after if retry_after != None else 1/self.rate
+            self.tokens = min(self.tokens, 0) - hold_time*self.rate
+
+        Stats.increment('rate_limit_throttled')
+
+
+    """
+    Call when the server responded normally. Speeds the rate back up.
+    """
+    def succeeded(self):
+        with self.lock:
+            self.__refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate*RateLimiter.RECOVERY)
+
+
+    """
+    Returns:
+        True if there are no requests waiting for tokens and a request of the given cost could be made right away
+    """
+    def is_idle(self, cost=1):
+        with self.lock:
+            self.__refill()
+            return self.num_waiting == 0 and self.tokens >= cost
+
+
+    # Takes tokens and returns (how long to wait until they are available, ticket to check the wait with)
+    def __reserve(self, cost, throw_exception=False):
+        with self.lock:
+            self.__refill()
+
+            if self.tokens >= cost:
+                self.tokens -= cost
+                self.num_reserved += cost
+                return 0, self.num_reserved
+
+            wait_time = (cost - self.tokens)/self.rate
+            if throw_exception:
+                raise Exception('This function is rate limited. Please wait ' + str(round(wait_time, 2)) + ' more seconds')
+
+            self.tokens -= cost
+            self.num_reserved += cost
+            return wait_time, self.num_reserved
+
+
+    # Returns how long a reservation still has to wait. Waiters check again after sleeping, since
+    # a throttled response since they reserved pushes everyone back and slows the refill down.
+    def __get_wait_time(self, ticket):
+        with self.lock:
+            self.__refill()
+            return (ticket - self.num_reserved - self.tokens)/self.rate
+
+
+    def __refill(self):
+        now = time.monotonic()
+        self.tokens      = min(self.burst, self.tokens + (now - self.last_refill)*self.rate)
+        self.last_refill = now
+
+
+
+"""
+Makes the decorated function take tokens from the rate limiter before running. If the
+function raises TooManyRequests, the rate limiter is throttled and the function is
+retried up to max_retries times.
+
+Args:
+    rate_limiter: (RateLimiter) rate limiter to take tokens from
+    cost: (float) tokens each call takes
+    throw_exception: (bool) raise an exception instead of waiting for tokens
+    max_retries: (int) how many times to retry a call that was throttled
+"""
+def rate_limited(rate_limiter, cost=1, throw_exception=False, max_retries=3):
 
     def wrap(func):
         def Func(*args, **kwargs):
-            try:    time_passed = time.clock() - Func.last_run_time
-            except: time_passed = rate_limit + 1
-            
-            if time_passed < rate_limit:
-                if throw_exception:
-                    raise Exception('This function is rate limited. Please wait ' + str(round(rate_limit - time_passed, 2)) + ' more seconds')
-                else:
-                    time.sleep(rate_limit - time_passed)
-            Func.last_run_time = time.clock()
-
-            return func(*args, **kwargs)
-
-        Func.last_run_time = None
+            for retry in range(max_retries + 1):
+                rate_limiter.acquire(cost, throw_exception)
+
+                try: result = func(*args, **kwargs)
+                except TooManyRequests as e:
+                    rate_limiter.throttled(e.retry_after)
+                    if retry == max_retries: raise
+                    continue
+
+                rate_limiter.succeeded()
+                return result
+
+        return Func
+
+    return wrap
+
+
+
+"""
+Same as rate_limited, for coroutine functions. Waiting for tokens does not block the
+event loop, and cancelling the call while it waits gives the tokens back.
+
+Args:
+    rate_limiter: (RateLimiter) rate limiter to take tokens from
+    cost: (float) tokens each call takes
+    max_retries: (int) how many times to retry a call that was throttled
+"""
+def rate_limited_async(rate_limiter, cost=1, max_retries=3):
+
+    def wrap(func):
+        async def Func(*args, **kwargs):
+            for retry in range(max_retries + 1):
+                await rate_limiter.acquire_async(cost)
+
+                try: result = await func(*args, **kwargs)
+                except TooManyRequests as e:
+                    rate_limiter.throttled(e.retry_after)
+                    if retry == max_retries: raise
+                    continue
+
+                rate_limiter.succeeded()
+                return result
+
         return Func
 
-    return wrap
\ No newline at end of file
+    return wrap
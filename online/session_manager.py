@@ -1,41 +1,76 @@
+import json
+import os
+import tempfile
+import threading
 import requests
 
+from online.http_client import HttpClient
+from online.osu_online import OsuOnline
+from online.rate_limited import TooManyRequests
 
-class SessionMgr(requests.Session):
 
-    def __init__(self):
-        requests.Session.__init__(self)
+class SessionMgr(HttpClient):
+
+    # Where the login cookies are kept between restarts
+    session_path = 'data/session.json'
+
+    def __init__(self, base_url='https://osu.ppy.sh'):
+        HttpClient.__init__(self)
+
+        self.base_url = base_url
 
         self._logged_in        = False
         self._last_status_code = None
+        self._login_lock       = threading.Lock()
 
         self.xsrf_token  = None
         self.osu_session = None
 
 
+    """
+    Logs in, unless already logged in. A session saved by an earlier run is reused
+    without checking it; if it turns out to have expired, call logout and log in again.
+    """
     def login(self, username, password):
         if self._logged_in: return
 
+        # Requests made from several threads at once share one login
+        with self._login_lock:
+            if self._logged_in: return
+            self.__login(username, password)
+
+
+    def is_logged_in(self):
+        return self._logged_in
+
+
+    def __login(self, username, password):
+        if self.load_session(): return
+
         # While being told there are too many login requests, attempt to log in
         while True:
             try:
                 login_data = { 'username': str(username), 'password' : str(password) }
-                response = self.post('https://osu.ppy.sh/session', data=login_data) 
+                response = self.post(self.base_url + '/session', data=login_data) 
             except Exception as e:
                 raise Exception('Unable to log in')
 
             self.validate_response(response)
             
             if response.status_code != 200:            
-                if response.status_code == 429: 
-                    raise Exception('Unable to log in; Too many requests')
+                if response.status_code == 429:
+                    # Lets the rate limited request logging in back off and retry, same as any other throttled request
+                    raise TooManyRequests(OsuOnline.get_retry_after(response.headers))
                 else:
                     raise Exception('Unable to log in; Status code: ' + str(response.status_code))
             
             break
 
         # Validate log in
-        response = self.fetch_web_data('https://osu.ppy.sh')
+        response = self.fetch_web_data(self.base_url)
+        if response.status_code == 429:
+            raise TooManyRequests(OsuOnline.get_retry_after(response.headers))
+
         if not 'XSRF-TOKEN' in response.cookies:
             raise Exception('Unable to log in; Cookies indicate login failed!')
 
@@ -43,6 +78,72 @@ class SessionMgr(requests.Session):
         self.osu_session = response.cookies['osu_session']
 
         self._logged_in = True
+        self.save_session()
+
+
+    """
+    Forgets the current session, including the saved one. Call when a response shows
+    the session has expired.
+    """
+    def logout(self):
+        self._logged_in  = False
+        self.xsrf_token  = None
+        self.osu_session = None
+        self.cookies.clear()
+
+        try: os.remove(SessionMgr.session_path)
+        except OSError: pass
+
+
+    """
+    Returns:
+        True if a saved session was found and restored
+    """
+    def load_session(self):
+        try:
+            with open(SessionMgr.session_path, 'rt', encoding='utf-8') as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if session.get('xsrf_token') == None or session.get('osu_session') == None:
+            return False
+
+        # A session saved for another server is of no use
+        if session.get('base_url', 'https://osu.ppy.sh') != self.base_url:
+            return False
+
+        for cookie in session['cookies']:
+            self.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'])
+
+        self.xsrf_token  = session['xsrf_token']
+        self.osu_session = session['osu_session']
+        self._logged_in  = True
+
+        return True
+
+
+    def save_session(self):
+        session = {
+            'base_url'    : self.base_url,
+            'xsrf_token'  : self.xsrf_token,
+            'osu_session' : self.osu_session,
+            'cookies'     : [ { 'name' : c.name, 'value' : c.value, 'domain' : c.domain, 'path' : c.path } for c in self.cookies ],
+        }
+
+        path = os.path.dirname(SessionMgr.session_path)
+        if path and not os.path.exists(path):
+            os.makedirs(path)
+
+        # The file is only readable by the owner since the cookies give access to the account
+        fd, tmp_filepath = tempfile.mkstemp(dir=path or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wt', encoding='utf-8') as f:
+                json.dump(session, f)
+            os.replace(tmp_filepath, SessionMgr.session_path)
+        except:
+            os.remove(tmp_filepath)
+            raise
 
 
     def fetch_web_data(self, url):
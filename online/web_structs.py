@@ -37,12 +37,12 @@ class WebBeatmap(JsonObj):
 
     def get_beatmap_data(self, refresh=False):
         if (self.beatmap_file == None) or refresh:
-            self.beatmap_file = OsuOnline.fetch_beatmap_file(self.id, strio=True)
+            self.beatmap_file = OsuOnline.fetch_beatmap_file(self.id, strio=True, beatmap_md5=getattr(self, 'checksum', None))
         return self.beatmap_file
 
 
     def download_beatmap(self, filepath):
-        beatmap_data = OsuOnline.fetch_beatmap_file(self.id)
+        beatmap_data = OsuOnline.fetch_beatmap_file(self.id, beatmap_md5=getattr(self, 'checksum', None))
         pathname     = filepath + '/' + self.name + '.osu'
         BeatmapIO.save_beatmap(beatmap_data, pathname)
 
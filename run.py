@@ -1,17 +1,17 @@
-from file.beatmap_io import BeatmapIO
-from file.replay_io import ReplayIO
-
-from online.osu_online import OsuOnline
-from online.cmd_online import CmdOnline
-
-from analysis.map_data import StdMapData
-from analysis.replay_data import StdReplayData
-from analysis.score_data import StdScoreData
-from analysis.score_metrics import StdScoreMetrics
-
+from bot.job_queue import JobQueue
+from bot.prefetcher import Prefetcher
+from cache.beatmap_cache import BeatmapCache
+from cache.job_checkpoint import JobCheckpoint
+from cache.replay_cache import ReplayCache
+from cache.result_cache import ResultCache
+from misc.stats import Stats
+
+import asyncio
 import discord
+import io
 import time
-import matplotlib.pyplot as plt
+
+from concurrent.futures import ProcessPoolExecutor
 
 
 client = discord.Client()
@@ -19,23 +19,39 @@ client = discord.Client()
 
 class HitOffsetBot():
 
-    last_run = None
+    # Downloads of all jobs share OsuOnline.rate_limiter, so a few jobs at once stay within the
+    # osu! rate budget while a cached or cheap map does not wait behind a long download job
+    job_queue   = JobQueue(num_workers=3)
+    render_pool = ProcessPoolExecutor(max_workers=1)
+    prefetcher  = Prefetcher(job_queue)
 
     @staticmethod
-    def get_hit_offsets(beatmap_id):
-        beatmap  = BeatmapIO.load_beatmap(OsuOnline.fetch_beatmap_file(beatmap_id, strio=True))
-        map_data = StdMapData.get_aimpoint_data(beatmap.hitobjects)
-        scores   = CmdOnline.get_scores(beatmap_id, 0, beatmap.metadata.name)
+    def plot_hit_offsets(beatmap_id):
+        # The pipeline and its dependencies are loaded by the first job, not at startup
+        from bot.hit_offsets import HitOffsets
+        from bot.hit_offset_plot import HitOffsetPlot
+
+        with Stats.timer('job'):
+            times, hit_offsets = HitOffsets.get_hit_offsets(beatmap_id)
 
-        replay_data_array = []
-        for score in scores:
-            replay_file = score.get_replay_data_web()
-            replay_data_array.append(StdReplayData.get_event_data(ReplayIO.load_replay(replay_file).play_data))
+            with Stats.timer('render'):
+                return HitOffsetBot.render_pool.submit(HitOffsetPlot.render, times, hit_offsets).result()
 
-        score_data_array = [ StdScoreData.get_score_data(replay_data, map_data) for replay_data in replay_data_array ]
-        per_hitobject_data = StdScoreMetrics.get_per_hitobject_score_data(score_data_array)
 
-        return StdScoreMetrics.trans_solve_for_hit_offset(per_hitobject_data)
+    # Writes out the access times the disk caches only kept in memory, so eviction order survives a restart
+    @staticmethod
+    def flush_caches():
+        for cache in [ BeatmapCache, JobCheckpoint, ReplayCache, ResultCache ]:
+            if cache.disk_cache != None:
+                cache.disk_cache.flush()
+
+
+    @staticmethod
+    async def update_presence():
+        if HitOffsetBot.job_queue.get_running_jobs() or HitOffsetBot.job_queue.get_num_pending() > 0:
+            await client.change_presence(activity=discord.Game('Working...'), status=discord.Status.dnd, afk=False)
+        else:
+            await client.change_presence(activity=discord.Game('Use me! Try .help'), status=discord.Status.online, afk=False)
 
 
     @staticmethod
@@ -45,8 +61,19 @@ class HitOffsetBot():
         if msg.author == client.user:
             return
 
+        if msg.content.startswith('.get'):
+            with Stats.timer('request'):
+                await HitOffsetBot.on_get(msg)
+        else:
+            with Stats.timer('on_message'):
+                await HitOffsetBot.on_command(msg)
+
+
+    @staticmethod
+    async def on_command(msg):
         if msg.content.startswith('.die'):
             await msg.channel.send('hell yea')
+            await asyncio.get_running_loop().run_in_executor(None, HitOffsetBot.flush_caches)
             exit(0)
 
         if msg.content.startswith('.help'):
@@ -55,52 +82,132 @@ class HitOffsetBot():
             await msg.channel.send('.get 123456')
             await msg.channel.send('.get https://old.ppy.sh/b/123456')
             await msg.channel.send('.get https://osu.ppy.sh/beatmapsets/541289#osu/123456')
+            await msg.channel.send('.status')
+            await msg.channel.send('.stats')
 
-        if msg.content.startswith('.get'):
-            if HitOffsetBot.last_run != None and time.time() - HitOffsetBot.last_run < 150:
-                await msg.channel.send('Please wait at least 2.5 minutes since last request')
+        if msg.content.startswith('.stats'):
+            lines = Stats.get_report()
+            if not lines:
+                await msg.channel.send('No stats yet')
                 return
 
-            map_id = msg.content.split(' ')[-1]
+            await msg.channel.send('```\n' + '\n'.join(lines) + '\n```')
 
-            # Try just map id
-            try: map_id = int(map_id)
-            except:
-                # Try website beatmap link
-                try: map_id = int(map_id.split('/')[-1])
-                except: 
-                    await msg.channel.send('invalid beatmap id or beatmap link')
-                    return
-            
-            HitOffsetBot.last_run = time.time()
-            await msg.channel.send('Please wait while I am fetching replays (~2.5 min)')
-            await msg.channel.send('I will be unresponsive and might go offline but should be back when done.')
+        if msg.content.startswith('.status'):
+            running_jobs = HitOffsetBot.job_queue.get_running_jobs()
+            pending_jobs = HitOffsetBot.job_queue.get_pending_jobs()
+
+            if not running_jobs:
+                await msg.channel.send('Idle')
+                return
+
+            for job in running_jobs:
+                await msg.channel.send('Working on ' + job.name + ' for ' + str(int(time.time() - job.start_time)) + ' s')
             
-            await client.change_presence(activity=discord.Game('Working...'), status=discord.Status.dnd, afk=False)
-            try: times, hit_offsets = HitOffsetBot.get_hit_offsets(map_id)
-            except Exception as e:
-                await client.change_presence(activity=discord.Game('Use me! Try .help'), status=discord.Status.online, afk=False)
-                await msg.channel.send('That map broke me! Blame abraker >:(')
-                await msg.channel.send(str(e))
+            if pending_jobs:
+                await msg.channel.send('Waiting: ' + ', '.join([ job.name for job in pending_jobs ]))
+
+
+    @staticmethod
+    async def on_get(msg):
+        map_id = msg.content.split(' ')[-1]
+
+        # Try just map id
+        try: map_id = int(map_id)
+        except:
+            # Try website beatmap link
+            try: map_id = int(map_id.split('/')[-1])
+            except: 
+                await msg.channel.send('invalid beatmap id or beatmap link')
                 return
+        
+        # Remembered until answered, so the request is picked back up if the bot restarts.
+        # The checkpoint is written to disk and shares its lock with the job threads; keep that off the event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, JobCheckpoint.add_request, map_id, msg.channel.id, msg.author.id)
+
+        job = HitOffsetBot.job_queue.submit(map_id, msg.author.id, str(map_id), HitOffsetBot.plot_hit_offsets, map_id)
+        HitOffsetBot.prefetcher.record_request(map_id)
+        position = HitOffsetBot.job_queue.get_position(job)
+
+        if job.num_waiters > 1: await msg.channel.send('Someone already requested this map; you will get the same result')
+        if position > 1:        await msg.channel.send('Your request is #' + str(position) + ' in line')
+        await msg.channel.send('Please wait while I am fetching replays (~2.5 min per request ahead of yours)')
+        
+        await HitOffsetBot.send_result(job, [ msg.channel ])
+
+
+    """
+    Resubmits a job that was requested before the bot restarted. The job continues
+    from the last replay it checkpointed.
+
+    Args:
+        beatmap_id: (int) id of the requested beatmap
+        requests: (list) (channel_id, user_id) of each request waiting on the job
+    """
+    @staticmethod
+    async def resume_job(beatmap_id, requests):
+        # on_ready runs again after reconnects; the job may already be back in the queue
+        if beatmap_id in HitOffsetBot.job_queue.jobs: return
 
-            plt.clf()
-            plt.plot(times, hit_offsets, lw=0.3, antialiased=True)
-            plt.xlabel('time (ms)')
-            plt.ylabel('offset (ms)')
-            plt.title('Per-hitobject offsets half of top 50 players do better/worse')
-            plt.savefig('fig.png', dpi=500)
+        channels = [ client.get_channel(channel_id) for channel_id, user_id in requests ]
+        channels = [ channel for channel in channels if channel != None ]
 
-            await msg.channel.send('', file=discord.File('fig.png', filename='fig.png'))
-            await client.change_presence(activity=discord.Game('Use me! Try .help'), status=discord.Status.online, afk=False)
+        if not channels:
+            await asyncio.get_running_loop().run_in_executor(None, JobCheckpoint.remove_request, beatmap_id)
+            return
+
+        job = HitOffsetBot.job_queue.submit(beatmap_id, requests[0][1], str(beatmap_id), HitOffsetBot.plot_hit_offsets, beatmap_id)
+        for channel in channels:
+            await channel.send('I restarted while working on ' + str(beatmap_id) + '; picking up where I left off')
+
+        await HitOffsetBot.send_result(job, channels)
+
+
+    """
+    Waits for the job and sends the image it made, or the error it ran into, to the channels
+
+    Args:
+        job: (JobQueue.Job) job to wait for
+        channels: (list) channels to send the result to
+    """
+    @staticmethod
+    async def send_result(job, channels):
+        loop = asyncio.get_running_loop()
+
+        await HitOffsetBot.update_presence()
+        try: image = await job.wait()
+        except Exception as e:
+            await loop.run_in_executor(None, JobCheckpoint.remove_request, job.key)
+            await HitOffsetBot.update_presence()
+            for channel in channels:
+                await channel.send('That map broke me! Blame abraker >:(')
+                await channel.send(str(e))
+            return
+
+        for channel in channels:
+            await channel.send('', file=discord.File(io.BytesIO(image), filename='fig.png'))
+
+        await loop.run_in_executor(None, JobCheckpoint.remove_request, job.key)
+        await HitOffsetBot.update_presence()
 
 
     @staticmethod
     @client.event
     async def on_ready():
         print('Bot ready')
+        HitOffsetBot.job_queue.start()
+        HitOffsetBot.prefetcher.start()
+
+        unanswered_requests = await asyncio.get_running_loop().run_in_executor(None, JobCheckpoint.get_requests)
+        for beatmap_id, requests in unanswered_requests.items():
+            asyncio.ensure_future(HitOffsetBot.resume_job(beatmap_id, requests))
+
         await client.change_presence(activity=discord.Game('Use me! Try .help'), status=discord.Status.online, afk=False)
 
 
 TOKEN = ''
-client.run(TOKEN)
\ No newline at end of file
+if __name__ == "__main__":
+    try: client.run(TOKEN)
+    finally:
+        HitOffsetBot.flush_caches()
\ No newline at end of file
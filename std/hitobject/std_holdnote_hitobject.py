@@ -30,9 +30,10 @@ class StdHoldNoteHitobject(Hitobject):
 
         self.to_repeat_time   = None
 
-        self.curve_points = []  # Points that define slider in editor
-        self.gen_points   = []  # The rough generated slider curve
-        self.tick_times   = []  # Slider ticks/score points/aimpoints
+        self.curve_points = []    # Points that define slider in editor
+        self.gen_points   = None  # The rough generated slider curve as an (N, 2) array; generated on first use
+        self.gen_lengths  = None  # Distance along the curve from its start to each of gen_points
+        self.tick_times   = []    # Slider ticks/score points/aimpoints
 
         Hitobject.__init__(self)
         
@@ -49,19 +50,23 @@ class StdHoldNoteHitobject(Hitobject):
         if percent <= 0.0: return 0
         if percent >= 1.0: return -1 if self.repeat == 0 else 0
 
-        idx = percent*len(self.gen_points)
-        idx_pos = triangle(idx*self.repeat, (2 * len(self.gen_points)) - 1)
+        gen_points = self.get_generated_curve_points()
+
+        idx = percent*len(gen_points)
+        idx_pos = triangle(idx*self.repeat, (2 * len(gen_points)) - 1)
         
         return int(idx_pos)
 
 
     def idx_to_pos(self, idx):
-        if idx > len(self.gen_points) - 2:
-            return Pos(self.gen_points[-1].x, self.gen_points[-1].y)
+        gen_points = self.get_generated_curve_points()
+
+        if idx > len(gen_points) - 2:
+            return Pos(float(gen_points[-1, 0]), float(gen_points[-1, 1]))
 
         percent_point = float(int(idx)) - idx
-        x_pos = lerp(self.gen_points[idx].x, self.gen_points[idx + 1].x, percent_point)
-        y_pos = lerp(self.gen_points[idx].y, self.gen_points[idx + 1].y, percent_point)
+        x_pos = lerp(float(gen_points[idx, 0]), float(gen_points[idx + 1, 0]), percent_point)
+        y_pos = lerp(float(gen_points[idx, 1]), float(gen_points[idx + 1, 1]), percent_point)
 
         return Pos(x_pos, y_pos)
 
@@ -70,14 +75,93 @@ class StdHoldNoteHitobject(Hitobject):
         return self.idx_to_pos(self.percent_to_idx(percent))
 
 
+    """
+    time_to_pos for many times at once
+
+    Args:
+        times: (list or numpy.array) times to get the slider's position at
+
+    Returns:
+        numpy array of shape (len(times), 2) with the positions
+    """
+    def times_to_pos(self, times):
+        import numpy as np
+
+        times    = np.asarray(times, dtype=np.float64)
+        percents = 1.0 - ((self.end_time - np.minimum(self.end_time, times)) / (self.end_time - self.time))
+
+        return self.percents_to_pos(percents)
+
+
+    """
+    percent_to_pos for many percents at once
+
+    Args:
+        percents: (numpy.array) percents of the slider's duration to get the slider's position at
+
+    Returns:
+        numpy array of shape (len(percents), 2) with the positions
+    """
+    def percents_to_pos(self, percents):
+        import numpy as np
+
+        gen_points = self.get_generated_curve_points()
+        num_points = len(gen_points)
+
+        # Same as percent_to_idx, on every percent
+        amplitude = (2 * num_points) - 1
+        idxs = np.abs(np.fmod(((percents*num_points)*self.repeat) + (amplitude / 2.0), amplitude) - (amplitude / 2.0)).astype(np.int64)
+        idxs[percents <= 0.0] = 0
+        idxs[percents >= 1.0] = (num_points - 1) if self.repeat == 0 else 0
+
+        return gen_points[np.minimum(idxs, num_points - 1)]
+
+
+    """
+    Args:
+        lengths: (numpy.array) distances along the slider's path from its start
+
+    Returns:
+        numpy array of shape (len(lengths), 2) with the points on the path at the distances
+    """
+    def lengths_to_pos(self, lengths):
+        import numpy as np
+
+        gen_points  = self.get_generated_curve_points()
+        gen_lengths = self.gen_lengths
+
+        return np.column_stack((np.interp(lengths, gen_lengths, gen_points[:, 0]), np.interp(lengths, gen_lengths, gen_points[:, 1])))
+
+
     def get_end_time(self):
         return self.end_time
 
 
+    """
+    The curve is generated the first time it's needed and kept, so loading a beatmap
+    doesn't pay for the curves of sliders nothing looks at.
+
+    Returns:
+        numpy array of shape (N, 2) with the points along the slider's path
+    """
     def get_generated_curve_points(self):
+        if self.gen_points is None:
+            # Imported here since StdHoldNoteIO imports this module
+            from std.hitobject.std_holdnote_io import StdHoldNoteIO
+            StdHoldNoteIO.process_curve_points(self)
+
         return self.gen_points
 
 
+    """
+    Returns:
+        numpy array with the distance along the slider's path from its start to each generated curve point
+    """
+    def get_generated_curve_lengths(self):
+        self.get_generated_curve_points()
+        return self.gen_lengths
+
+
     def get_last_aimpoint_time(self):
         return self.tick_times[-1]
 
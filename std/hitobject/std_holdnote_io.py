@@ -15,8 +15,8 @@ class StdHoldNoteIO():
 
         StdHoldNoteIO.__process_hitobject_data(data, holdnote, difficulty)
         StdHoldNoteIO.__process_slider_data(data, holdnote)
-        StdHoldNoteIO.__process_curve_points(holdnote)
 
+        # The curve is generated by holdnote.get_generated_curve_points once it's needed
         return holdnote
 
 
@@ -46,64 +46,91 @@ class StdHoldNoteIO():
         holdnote.pixel_length = float(data[7])
 
     
+    """
+    Generates the slider's path from its curve points
+
+    Args:
+        holdnote: (StdHoldNoteHitobject) slider to generate holdnote.gen_points and holdnote.gen_lengths of
+    """
     @staticmethod
-    def __process_curve_points(holdnote):
-        holdnote.gen_points  = []
+    def process_curve_points(holdnote):
+        # numpy is only needed once a slider's curve is generated
+        import numpy as np
+
+        # Built on the side and assigned once done, so holdnote.gen_points is never seen half generated
+        gen_points = np.empty((0, 2))
 
         if holdnote.curve_type == StdHoldNoteHitobject.BEZIER:
-            StdHoldNoteIO.__make_bezier(holdnote)
-            return
+            gen_points = StdHoldNoteIO.__make_bezier(holdnote.curve_points)
 
-        if holdnote.curve_type == StdHoldNoteHitobject.CIRCUMSCRIBED:
+        elif holdnote.curve_type == StdHoldNoteHitobject.CIRCUMSCRIBED:
             if len(holdnote.curve_points) == 3:
-                if not StdHoldNoteIO.__make_circumscribed(holdnote):
-                    StdHoldNoteIO.__make_bezier(holdnote)
+                gen_points = StdHoldNoteIO.__make_circumscribed(holdnote)
+                if gen_points is None:
+                    gen_points = StdHoldNoteIO.__make_bezier(holdnote.curve_points)
             else:
-                StdHoldNoteIO.__make_bezier(holdnote)
+                gen_points = StdHoldNoteIO.__make_bezier(holdnote.curve_points)
+
+        elif holdnote.curve_type == StdHoldNoteHitobject.LINEAR1:
+            gen_points = StdHoldNoteIO.__make_linear(holdnote.curve_points)
 
-            return
+        elif holdnote.curve_type == StdHoldNoteHitobject.LINEAR2:
+            gen_points = StdHoldNoteIO.__make_linear(holdnote.curve_points)
 
-        if holdnote.curve_type == StdHoldNoteHitobject.LINEAR1:
-            StdHoldNoteIO.__make_linear(holdnote)
-            return
+        else:
+            holdnote.end_point = holdnote.curve_points[-1] if (holdnote.repeat % 2 == 0) else holdnote.curve_points[-1]
 
-        if holdnote.curve_type == StdHoldNoteHitobject.LINEAR2:
-            StdHoldNoteIO.__make_linear(holdnote)
-            return
-        
-        holdnote.end_point = holdnote.curve_points[-1] if (holdnote.repeat % 2 == 0) else holdnote.curve_points[-1]
+        # Distance along the path from its start to each point
+        gen_lengths = np.zeros(len(gen_points))
+        if len(gen_points) > 1:
+            np.cumsum(np.hypot(*np.diff(gen_points, axis=0).T), out=gen_lengths[1:])
+
+        holdnote.gen_lengths = gen_lengths
+        holdnote.gen_points  = gen_points
 
 
     @staticmethod
-    def __make_linear(self):
+    def __make_linear(curve_points):
+        import numpy as np
+
         # Lines: generate a new curve for each sequential pair
         # ab  bc  cd  de  ef  fg
+        segments = [ np.empty((0, 2)) ]
 
-        for i in range(len(self.curve_points) - 1):
-            bezier = Bezier([ self.curve_points[i], self.curve_points[i + 1] ])
-            self.gen_points += bezier.curve_points
+        for i in range(len(curve_points) - 1):
+            bezier = Bezier([ curve_points[i], curve_points[i + 1] ])
+            segments.append(bezier.curve_points)
+
+        return np.concatenate(segments)
 
 
     @staticmethod
-    def __make_bezier(self):
+    def __make_bezier(curve_points):
+        import numpy as np
+
         # Beziers: splits points into different Beziers if has the same points (red points)
         # a b c - c d - d e f g
+        segments      = [ np.empty((0, 2)) ]
         point_section = []
 
-        for i in range(len(self.curve_points)):
-            point_section.append(self.curve_points[i])
+        for i in range(len(curve_points)):
+            point_section.append(curve_points[i])
 
-            not_end_of_list = (i < len(self.curve_points) - 1)
-            segment_bezier  = (self.curve_points[i] == self.curve_points[i + 1]) if not_end_of_list else True
+            not_end_of_list = (i < len(curve_points) - 1)
+            segment_bezier  = (curve_points[i] == curve_points[i + 1]) if not_end_of_list else True
 
             # If we reached a red point or the end of the point list, then segment the bezier
             if segment_bezier:
-                self.gen_points += Bezier(point_section).curve_points
+                segments.append(Bezier(point_section).curve_points)
                 point_section = []
 
+        return np.concatenate(segments)
+
 
     @staticmethod
     def __make_circumscribed(holdnote):
+        import numpy as np
+
         # construct the three points
         start = holdnote.curve_points[0]
         mid   = holdnote.curve_points[1]
@@ -116,7 +143,7 @@ class StdHoldNoteIO():
         norb = (mid - end).nor()
 
         circle_center = intersect(mida, nora, midb, norb)
-        if not circle_center: return False
+        if not circle_center: return None
 
         start_angle_point = start - circle_center
         mid_angle_point   = mid - circle_center
@@ -137,7 +164,7 @@ class StdHoldNoteIO():
                 end_angle -= 2*math.pi   
             else:
                 print('Cannot find angles between mid_angle')
-                return False
+                return None
 
         # find an angle with an arc length of pixelLength along this circle
         radius = start_angle_point.distance_to(Pos(0, 0))
@@ -148,9 +175,5 @@ class StdHoldNoteIO():
         step = holdnote.pixel_length / 5  # 5 = CURVE_POINTS_SEPERATION
         len = int(step) + 1
 
-        for i in range(len):
-            ang = lerp(start_angle, end_angle, i/step)
-            xy  = Pos(math.cos(ang)*radius + circle_center.x, math.sin(ang)*radius + circle_center.y)
-            holdnote.gen_points.append(Pos(xy.x, xy.y))
-        
-        return True
\ No newline at end of file
+        ang = lerp(start_angle, end_angle, np.arange(len)/step)
+        return np.column_stack((np.cos(ang)*radius + circle_center.x, np.sin(ang)*radius + circle_center.y))
\ No newline at end of file
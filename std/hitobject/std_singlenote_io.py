@@ -14,6 +14,33 @@ class StdSingleNoteIO():
         return singlenote
 
 
+    """
+    Loads many hitobjects at once from columns that were already parsed
+
+    Args:
+        xs, ys, times, hitobject_types: (list) one int per hitobject
+        difficulty: (Beatmap.Difficulty) difficulty of the beatmap
+
+    Returns:
+        List of StdSingleNoteHitobject
+    """
+    @staticmethod
+    def load_singlenotes(xs, ys, times, hitobject_types, difficulty):
+        singlenotes = []
+
+        for x, y, time, hitobject_type in zip(xs, ys, times, hitobject_types):
+            singlenote = StdSingleNoteHitobject()
+
+            singlenote.pos            = Pos(x, y)
+            singlenote.time           = time
+            singlenote.hitobject_type = hitobject_type
+            singlenote.difficulty     = difficulty
+
+            singlenotes.append(singlenote)
+
+        return singlenotes
+
+
     @staticmethod
     def __process_hitobject_data(data, singlenote, difficulty):
         singlenote.pos            = Pos(int(data[0]), int(data[1]))
@@ -0,0 +1,46 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from file.beatmap_io import BeatmapIO
+from misc.pos import Pos
+from std.hitobject.std_singlenote_hitobject import StdSingleNoteHitobject
+from std.hitobject.std_holdnote_hitobject import StdHoldNoteHitobject
+from std.hitobject.std_spinner_hitobject import StdSpinnerHitobject
+
+
+BEATMAP_DATA = '\r\n'.join([
+    'osu file format v14', '',
+    '[General]', 'Mode: 0', '',
+    '[Metadata]', 'Title:Title', 'Artist:Artist', 'Creator:Creator', 'Version:Hard', '',
+    '[Difficulty]', 'CircleSize:4', 'OverallDifficulty:8', 'ApproachRate:9', 'SliderMultiplier:1.4', 'SliderTickRate:1', '',
+    '[TimingPoints]', '0,500,4,2,0,60,1,0', '',
+    '[HitObjects]',
+    '64,96,1000,5,0,0:0:0:0:',
+    '',
+    '100,200,1500,2,0,B|200:200|300:100,2,140',
+    '256,192,3000,12,0,4000,0:0:0:0:',
+    '128,64,4500,1,0,0:0:0:0:',
+    '128,64,5000,128,0,5500:0:0:0:0:',
+    '',
+])
+
+
+def test_load_hitobjects():
+    beatmap = BeatmapIO.load_beatmap(io.StringIO(BEATMAP_DATA))
+
+    # The line of a mania hold note is left out
+    assert [ type(hitobject) for hitobject in beatmap.hitobjects ] == [ StdSingleNoteHitobject, StdHoldNoteHitobject, StdSpinnerHitobject, StdSingleNoteHitobject ]
+    assert [ hitobject.time for hitobject in beatmap.hitobjects ] == [ 1000, 1500, 3000, 4500 ]
+    assert [ hitobject.pos for hitobject in beatmap.hitobjects ] == [ Pos(64, 96), Pos(100, 200), Pos(256, 192), Pos(128, 64) ]
+    assert [ hitobject.hitobject_type for hitobject in beatmap.hitobjects ] == [ 5, 2, 12, 1 ]
+
+    slider = beatmap.hitobjects[1]
+    assert slider.curve_points == [ Pos(100, 200), Pos(200, 200), Pos(300, 100) ]
+    assert slider.repeat == 2
+    assert slider.pixel_length == 140
+
+    assert beatmap.hitobjects[2].end_time == 4000
+    assert list(beatmap.end_times.values()) == [ 0, 1, 2, 3 ]
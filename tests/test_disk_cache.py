@@ -0,0 +1,129 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pytest
+
+from cache.disk_cache import DiskCache
+
+
+# Stands in for time.time, so entries can be aged without waiting
+class Clock():
+
+    def __init__(self):
+        self.now = 1000.0
+
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'time', clock.time)
+    return clock
+
+
+def get_filenames(path):
+    return sorted(os.listdir(str(path)))
+
+
+def read_index(path):
+    with open(os.path.join(str(path), DiskCache.INDEX_FILENAME), 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_get_put(tmp_path):
+    disk_cache = DiskCache(str(tmp_path))
+    disk_cache.put('a', b'data', { 'md5' : 'x' })
+
+    assert disk_cache.get('a') == b'data'
+    assert disk_cache.get_meta('a') == { 'md5' : 'x' }
+    assert disk_cache.get('b') == None
+
+    # Another instance reads the same entries from the index
+    assert DiskCache(str(tmp_path)).get('a') == b'data'
+
+
+def test_ttl(tmp_path, clock):
+    disk_cache = DiskCache(str(tmp_path), ttl=60)
+    disk_cache.put('a', b'data')
+
+    clock.now += 60
+    assert disk_cache.get('a') == b'data'
+    assert disk_cache.get_age('a') == 60
+
+    # Expired entries are removed along with their file
+    clock.now += 1
+    assert disk_cache.get('a') == None
+    assert disk_cache.keys() == []
+    assert get_filenames(tmp_path) == [ DiskCache.INDEX_FILENAME ]
+
+
+def test_lru_eviction(tmp_path, clock):
+    disk_cache = DiskCache(str(tmp_path), max_size=10)
+
+    disk_cache.put('a', b'1234')
+    clock.now += 1
+    disk_cache.put('b', b'1234')
+    clock.now += 1
+    disk_cache.get('a')
+    clock.now += 1
+
+    # b was used least recently, so it makes room for c
+    disk_cache.put('c', b'1234')
+    assert sorted(disk_cache.keys()) == [ 'a', 'c' ]
+    assert disk_cache.get_size() == 8
+    assert len(get_filenames(tmp_path)) == 3
+
+
+def test_access_time_flush(tmp_path, clock):
+    disk_cache = DiskCache(str(tmp_path), max_size=10)
+    disk_cache.put('a', b'1234')
+
+    clock.now += 1
+    disk_cache.get('a')
+
+    # The read is only kept in memory until the flush
+    assert read_index(tmp_path)['a']['last_access'] == 1000
+    disk_cache.flush()
+    assert read_index(tmp_path)['a']['last_access'] == 1001
+
+
+def test_write_atomic(tmp_path, monkeypatch):
+    disk_cache = DiskCache(str(tmp_path))
+    disk_cache.put('a', b'old')
+    assert not any(filename.endswith('.tmp') for filename in get_filenames(tmp_path))
+
+    def fail(src, dst):
+        raise OSError('disk full')
+
+    # A write that fails leaves the old entry and index in place, and no temporary file behind
+    monkeypatch.setattr(os, 'replace', fail)
+    with pytest.raises(OSError):
+        disk_cache.put('a', b'new')
+    monkeypatch.undo()
+
+    assert not any(filename.endswith('.tmp') for filename in get_filenames(tmp_path))
+    assert disk_cache.get('a') == b'old'
+    assert DiskCache(str(tmp_path)).get('a') == b'old'
+
+
+def test_put_meta(tmp_path):
+    disk_cache = DiskCache(str(tmp_path))
+    disk_cache.put('a', b'data', { 'validated' : 1 })
+
+    entry_filepath = [ os.path.join(str(tmp_path), filename) for filename in os.listdir(str(tmp_path)) if filename != DiskCache.INDEX_FILENAME ][0]
+    mtime = os.stat(entry_filepath).st_mtime_ns
+
+    assert disk_cache.put_meta('a', { 'validated' : 2 })
+    assert not disk_cache.put_meta('b', { 'validated' : 2 })
+
+    # The contents are not rewritten, and the new metadata is on disk
+    assert os.stat(entry_filepath).st_mtime_ns == mtime
+    assert DiskCache(str(tmp_path)).get_meta('a') == { 'validated' : 2 }
+    assert DiskCache(str(tmp_path)).get('a') == b'data'
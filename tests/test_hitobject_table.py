@@ -0,0 +1,97 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+import pytest
+
+from file.beatmap_io import BeatmapIO
+from analysis.map_data import StdMapData
+from std.std_hitobject import Hitobject
+
+
+# Circles, bezier, perfect circle and linear sliders, and spinners, with inherited timing points in between
+HITOBJECT_LINES = [
+    '64,96,{time},5,0,0:0:0:0:',
+    '100,200,{time},2,0,B|200:200|300:100,2,140',
+    '320,240,{time},1,0,0:0:0:0:',
+    '100,200,{time},2,0,P|200:100|300:200,1,200',
+    '400,80,{time},2,0,L|470:80,1,70',
+    '256,192,{time},12,0,{end_time},0:0:0:0:',
+]
+
+
+def make_beatmap_data(num_repeats):
+    lines = [
+        'osu file format v14', '',
+        '[General]', 'Mode: 0', '',
+        '[Metadata]', 'Title:Title', 'Artist:Artist', 'Creator:Creator', 'Version:Hard', '',
+        '[Difficulty]', 'CircleSize:4', 'OverallDifficulty:8', 'ApproachRate:9', 'SliderMultiplier:1.4', 'SliderTickRate:1', '',
+        '[TimingPoints]', '0,500,4,2,0,60,1,0', '10000,-50,4,2,0,60,0,0', '20000,-150,4,2,0,60,0,0', '',
+        '[HitObjects]',
+    ]
+
+    time = 1000
+    for _ in range(num_repeats):
+        for line in HITOBJECT_LINES:
+            lines.append(line.format(time=time, end_time=time + 1000))
+            time += 1500
+
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture(scope='module')
+def beatmap_data():
+    return make_beatmap_data(50)
+
+
+@pytest.fixture(scope='module')
+def beatmap(beatmap_data):
+    return BeatmapIO.load_beatmap(io.StringIO(beatmap_data), hitobject_table=True)
+
+
+# The same beatmap loaded as a list of hitobjects
+@pytest.fixture(scope='module')
+def hitobjects(beatmap_data):
+    return BeatmapIO.load_beatmap(io.StringIO(beatmap_data)).hitobjects
+
+
+def test_not_built_unless_asked():
+    beatmap = BeatmapIO.load_beatmap(io.StringIO(make_beatmap_data(2)))
+    assert beatmap.hitobject_table is None
+
+
+def test_replaces_hitobjects(beatmap, hitobjects):
+    # Only sliders are kept as objects
+    assert beatmap.hitobjects == []
+    assert beatmap.get_num_hitobjects() == len(hitobjects)
+    assert len(beatmap.hitobject_table.sliders) == len([ hitobject for hitobject in hitobjects if hitobject.is_hitobject_type(Hitobject.SLIDER) ])
+
+
+def test_columns_match_hitobjects(beatmap, hitobjects):
+    table = beatmap.hitobject_table
+    assert len(table) == len(hitobjects)
+
+    for i, hitobject in enumerate(hitobjects):
+        assert table.time[i]         == hitobject.time
+        assert table.end_time[i]     == hitobject.get_end_time()
+        assert table.x[i]            == hitobject.pos.x
+        assert table.y[i]            == hitobject.pos.y
+        assert table.type[i]         == hitobject.hitobject_type
+        assert table.repeat[i]       == getattr(hitobject, 'repeat', 0)
+        assert table.pixel_length[i] == getattr(hitobject, 'pixel_length', 0.0)
+
+
+def test_aimpoint_data_matches_hitobjects(beatmap, hitobjects):
+    map_data       = StdMapData.get_aimpoint_data(hitobjects)
+    table_map_data = StdMapData.get_aimpoint_data(beatmap.hitobjects, beatmap.hitobject_table)
+
+    assert len(map_data) == len(table_map_data)
+    for aimpoints, table_aimpoints in zip(map_data, table_map_data):
+        assert len(aimpoints) == len(table_aimpoints)
+
+        for (time, pos), (table_time, table_pos) in zip(aimpoints, table_aimpoints):
+            assert time == table_time
+            assert np.array_equal(np.asarray(pos, dtype=float), np.asarray(table_pos, dtype=float))
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pytest
+
+from bot.job_queue import JobQueue
+
+
+# Lets the workers pick up what was submitted
+async def settle():
+    for _ in range(10): await asyncio.sleep(0)
+
+
+def test_round_robin_order():
+    job_queue = JobQueue(num_workers=1)
+    release   = threading.Event()
+    run_order = []
+
+    def func(name):
+        if name == 'a1': release.wait(5)
+        run_order.append(name)
+        return name
+
+    async def run():
+        jobs = { 'a1' : job_queue.submit('a1', 'a', 'a1', func, 'a1') }
+        await settle()
+
+        for name in [ 'a2', 'a3', 'b1', 'c1' ]:
+            jobs[name] = job_queue.submit(name, name[0], name, func, name)
+
+        # User a queued more, but b and c get their turn before a's second queued job
+        assert job_queue.get_running_jobs() == [ jobs['a1'] ]
+        assert [ job.name for job in job_queue.get_pending_jobs() ] == [ 'a2', 'b1', 'c1', 'a3' ]
+        assert job_queue.get_position(jobs['a1']) == 0
+        assert job_queue.get_position(jobs['a3']) == 4
+        assert job_queue.get_num_pending() == 4
+
+        release.set()
+        for job in jobs.values(): await job.wait()
+
+        assert job_queue.get_position(jobs['a3']) == None
+
+    asyncio.run(run())
+    job_queue.executor.shutdown()
+
+    assert run_order == [ 'a1', 'a2', 'b1', 'c1', 'a3' ]
+
+
+def test_coalesce_by_key():
+    job_queue = JobQueue(num_workers=1)
+    release   = threading.Event()
+    calls     = []
+
+    def func():
+        release.wait(5)
+        calls.append(1)
+        return object()
+
+    async def run():
+        job       = job_queue.submit('key', 'a', 'job', func)
+        same_job  = job_queue.submit('key', 'b', 'job', func)
+        other_job = job_queue.submit('other', 'b', 'job', func)
+
+        assert same_job is job
+        assert job.num_waiters == 2
+        assert job_queue.get_num_pending() == 2
+
+        release.set()
+        results = await asyncio.gather(job.wait(), same_job.wait(), other_job.wait())
+
+        assert results[0] is results[1]
+        assert results[0] is not results[2]
+
+    asyncio.run(run())
+    job_queue.executor.shutdown()
+
+    assert len(calls) == 2
+
+
+def test_exception():
+    job_queue = JobQueue(num_workers=1)
+
+    def fail():
+        raise ValueError('failed')
+
+    async def run():
+        job = job_queue.submit('key', 'a', 'job', fail)
+        with pytest.raises(ValueError):
+            await job.wait()
+
+        # The failed job is done with, so the key runs again and the worker keeps going
+        job = job_queue.submit('key', 'a', 'job', lambda: 'done')
+        assert await job.wait() == 'done'
+
+    asyncio.run(run())
+    job_queue.executor.shutdown()
+
+
+def test_cancelled_wait():
+    job_queue = JobQueue(num_workers=1)
+    release   = threading.Event()
+
+    def func():
+        release.wait(5)
+        return 'done'
+
+    async def run():
+        job = job_queue.submit('key', 'a', 'job', func)
+        job_queue.submit('key', 'b', 'job', func)
+
+        wait = asyncio.ensure_future(job.wait())
+        await settle()
+        wait.cancel()
+
+        # One waiter giving up does not cancel the job for the other
+        release.set()
+        assert await job.wait() == 'done'
+
+    asyncio.run(run())
+    job_queue.executor.shutdown()
+
+
+def test_workers_run_together():
+    job_queue = JobQueue(num_workers=2)
+
+    # Passes only if both jobs are running at the same time
+    barrier = threading.Barrier(2, timeout=5)
+
+    async def run():
+        jobs = [ job_queue.submit(key, key, 'job', barrier.wait) for key in [ 'a', 'b' ] ]
+        await asyncio.gather(*[ job.wait() for job in jobs ])
+
+    asyncio.run(run())
+    job_queue.executor.shutdown()
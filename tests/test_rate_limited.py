@@ -0,0 +1,171 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pytest
+
+from online.rate_limited import RateLimiter, TooManyRequests, rate_limited
+
+
+# Stands in for time.monotonic and time.sleep, so waits take no time and can be checked
+class Clock():
+
+    def __init__(self):
+        self.now    = 1000.0
+        self.sleeps = []
+
+
+    def monotonic(self):
+        return self.now
+
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += max(seconds, 1e-6)  # a real sleep always takes a little time, even when rounding left a tiny wait
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(time, 'sleep', clock.sleep)
+    return clock
+
+
+def reserve(limiter, cost=1):
+    return limiter._RateLimiter__reserve(cost)
+
+
+def get_wait_time(limiter, ticket):
+    return limiter._RateLimiter__get_wait_time(ticket)
+
+
+def test_burst(clock):
+    limiter = RateLimiter(rate=10, burst=2)
+
+    limiter.acquire()
+    limiter.acquire()
+    assert clock.sleeps == []
+
+    limiter.acquire()
+    assert clock.sleeps == [ pytest.approx(0.1) ]
+
+
+def test_waiters_in_order(clock):
+    limiter = RateLimiter(rate=10, burst=1)
+
+    reservations = [ reserve(limiter) for _ in range(3) ]
+    assert [ wait_time for wait_time, ticket in reservations ] == [ 0, pytest.approx(0.1), pytest.approx(0.2) ]
+
+    # Once the second is due, the third still waits for its own token
+    clock.now += 0.1
+    assert get_wait_time(limiter, reservations[1][1]) == pytest.approx(0)
+    assert get_wait_time(limiter, reservations[2][1]) == pytest.approx(0.1)
+
+
+def test_throw_exception(clock):
+    limiter = RateLimiter(rate=10, burst=1)
+    limiter.acquire()
+
+    with pytest.raises(Exception):
+        limiter.acquire(throw_exception=True)
+
+    # The failed call took no tokens
+    assert limiter.num_reserved == 1
+    assert reserve(limiter)[0] == pytest.approx(0.1)
+
+
+def test_throttled_holds_waiters(clock):
+    limiter = RateLimiter(rate=10, burst=1)
+    limiter.acquire()
+
+    wait_time, ticket = reserve(limiter)
+    assert wait_time == pytest.approx(0.1)
+
+    # Waiters are held off for retry_after, then wait for their token at the halved rate
+    limiter.throttled(retry_after=2)
+    assert limiter.rate == 5
+    assert get_wait_time(limiter, ticket) == pytest.approx(2 + 1/5)
+
+
+def test_throttled_and_succeeded_rate(clock):
+    limiter = RateLimiter(rate=8, burst=1, max_rate=16)
+
+    for _ in range(5): limiter.throttled()
+    assert limiter.rate == 1  # min_rate defaults to rate/8
+
+    limiter.succeeded()
+    assert limiter.rate == pytest.approx(1 + 16*RateLimiter.RECOVERY)
+
+    for _ in range(20): limiter.succeeded()
+    assert limiter.rate == 16
+
+
+def test_is_idle(clock):
+    limiter = RateLimiter(rate=10, burst=1)
+    assert limiter.is_idle()
+
+    limiter.acquire()
+    assert not limiter.is_idle()
+
+    clock.now += 0.1
+    assert limiter.is_idle()
+
+
+def test_rate_limited_retries(clock):
+    limiter = RateLimiter(rate=10, burst=1)
+    calls   = []
+
+    @rate_limited(limiter, max_retries=2)
+    def func():
+        calls.append(time.monotonic())
+        if len(calls) < 3: raise TooManyRequests(retry_after=1)
+        return 'done'
+
+    assert func() == 'done'
+    assert len(calls) == 3
+    assert limiter.rate == pytest.approx(10/4 + 10*RateLimiter.RECOVERY)
+
+    # Retries wait out the hold the server asked for
+    assert calls[1] - calls[0] >= 1
+
+
+def test_rate_limited_gives_up(clock):
+    limiter = RateLimiter(rate=10, burst=1)
+
+    @rate_limited(limiter, max_retries=1)
+    def func():
+        raise TooManyRequests()
+
+    with pytest.raises(TooManyRequests):
+        func()
+
+
+def test_acquire_async_cancelled():
+    limiter = RateLimiter(rate=10, burst=1)
+
+    async def run():
+        limiter.acquire()
+
+        first  = asyncio.ensure_future(limiter.acquire_async())
+        second = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0)
+        assert limiter.num_waiting == 2
+
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+
+        # The cancelled request's token is given back, so the next request waits behind the first only
+        assert limiter.num_waiting == 1
+        assert reserve(limiter)[0] == pytest.approx(0.2, abs=0.05)
+
+        start = time.monotonic()
+        await first
+        assert time.monotonic() - start == pytest.approx(0.1, abs=0.05)
+        assert limiter.num_waiting == 0
+
+    asyncio.run(run())
@@ -0,0 +1,66 @@
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pytest
+
+from cache.replay_cache import ReplayCache
+
+
+# Smallest .osr header load_replay_hash can read, padded so every replay is the same size
+def make_replay(score_id, size=100):
+    replay_hash = ('%032d' % score_id).encode('utf-8')
+    data = struct.pack('<bi', 0, 20200101) + b'\x00' + b'\x00' + b'\x0b' + bytes([ len(replay_hash) ]) + replay_hash
+    return data + b'\x00'*(size - len(data))
+
+
+@pytest.fixture
+def replay_cache(tmp_path):
+    path, max_size = ReplayCache.path, ReplayCache.max_size
+
+    ReplayCache.path       = str(tmp_path / 'replays')
+    ReplayCache.disk_cache = None
+    ReplayCache.score_ids  = None
+
+    yield ReplayCache
+
+    ReplayCache.path       = path
+    ReplayCache.max_size   = max_size
+    ReplayCache.disk_cache = None
+    ReplayCache.score_ids  = None
+
+
+def test_get_put(replay_cache):
+    replay_cache.max_size = 1024
+
+    replay_cache.put_replay(1, make_replay(1))
+
+    assert replay_cache.has_replay(1)
+    assert replay_cache.get_replay(1) == make_replay(1)
+    assert not replay_cache.has_replay(2)
+
+
+def test_has_replay_after_eviction(replay_cache):
+    # Room for one replay only, so storing the second evicts the first
+    replay_cache.max_size = 150
+
+    replay_cache.put_replay(1, make_replay(1))
+    replay_cache.put_replay(2, make_replay(2))
+
+    assert not replay_cache.has_replay(1)
+    assert replay_cache.get_replay(1) == None
+    assert replay_cache.has_replay(2)
+
+
+def test_has_replay_after_eviction_by_other_instance(replay_cache):
+    replay_cache.max_size = 150
+
+    replay_cache.put_replay(1, make_replay(1))
+
+    # Evicted behind the score id map's back
+    replay_cache.disk_cache.put('other', b'\x00'*120)
+
+    assert not replay_cache.has_replay(1)
+    assert replay_cache.get_replay(1) == None
@@ -0,0 +1,46 @@
+import collections
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pytest
+
+from misc.stats import Stats
+
+
+@pytest.fixture
+def stats():
+    timings, counters = Stats.timings, Stats.counters
+
+    Stats.timings  = collections.OrderedDict()
+    Stats.counters = collections.OrderedDict()
+
+    yield Stats
+
+    Stats.timings  = timings
+    Stats.counters = counters
+
+
+def test_hit_rate(stats):
+    stats.increment('cache_hit', 3)
+    stats.increment('cache_miss')
+
+    assert stats.get_report() == [ '%-20s %.1f%% hit rate (%d/%d)' % ('cache', 75.0, 3, 4) ]
+
+
+def test_zero_increment(stats):
+    # An empty leaderboard reuses nothing and misses nothing
+    stats.increment('score_data_reuse_hit', 0)
+    stats.increment('score_data_reuse_miss', 0)
+
+    assert stats.get_count('score_data_reuse_hit') == 0
+    assert stats.get_report() == []
+
+
+def test_zero_total_pair(stats):
+    stats.counters['score_data_reuse_hit']  = 0
+    stats.counters['score_data_reuse_miss'] = 0
+    stats.increment('requests')
+
+    assert stats.get_report() == [ '%-20s %d' % ('requests', 1) ]